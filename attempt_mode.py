@@ -0,0 +1,114 @@
+"""Interactive attempt mode for a generated paper
+
+The paper is sent once to the attempt_component browser component, which
+handles answering, the timer and scoring without a server rerun per click.
+On submit it returns one compact result: the answers, seconds spent on each
+question and the elapsed time. That result is re-scored here against the
+paper, so the question-wise analysis does not depend on the browser's count.
+"""
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+# Time allowed per question in attempt mode; 0 leaves attempts untimed
+ATTEMPT_SECONDS_PER_QUESTION = int(os.getenv("ATTEMPT_SECONDS_PER_QUESTION", 60))
+
+_attempt_component = components.declare_component(
+    "attempt_mode",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "attempt_component")
+)
+
+def build_attempt_paper(test_data, test_id):
+    """The paper in the compact form the component takes, answers included for client-side scoring"""
+    questions = []
+    for question in test_data.get('questions', []):
+        if question.get('type') == 'mcq' and question.get('options'):
+            questions.append({
+                "type": "mcq",
+                "text": question.get('question', ''),
+                "options": [[str(key), str(text)] for key, text in question['options'].items()],
+                "answer": question.get('correct_answer'),
+                "explanation": question.get('explanation', '')
+            })
+        else:
+            questions.append({
+                "type": "short_answer",
+                "text": question.get('question', ''),
+                "explanation": question.get('sample_answer', '')
+            })
+    return {
+        "test_id": test_id,
+        "time_limit": ATTEMPT_SECONDS_PER_QUESTION * len(questions),
+        "questions": questions
+    }
+
+def attempt_test(test_data, test_id):
+    """Show the attempt component; returns the submitted result, or None before the first submit"""
+    return _attempt_component(
+        paper=build_attempt_paper(test_data, test_id),
+        key=f"attempt_{test_id}",
+        default=None
+    )
+
+def score_attempt(test_data, result):
+    """Score a submitted result against the paper, with one analysis row per question"""
+    questions = test_data.get('questions', [])
+    answers = list(result.get('answers') or [])[:len(questions)]
+    answers += [None] * (len(questions) - len(answers))
+    seconds = list(result.get('seconds') or [])[:len(questions)]
+    seconds += [0] * (len(questions) - len(seconds))
+
+    rows = []
+    correct = scored = answered = 0
+    for i, (question, answer, spent) in enumerate(zip(questions, answers, seconds), 1):
+        if answer is not None:
+            answered += 1
+        if question.get('type') == 'mcq' and question.get('correct_answer'):
+            scored += 1
+            if answer is None:
+                outcome = "⏭️ Skipped"
+            elif answer == question['correct_answer']:
+                outcome = "✅ Correct"
+                correct += 1
+            else:
+                outcome = "❌ Wrong"
+            expected = question['correct_answer']
+        else:
+            outcome = "📝 Answered" if answer is not None else "⏭️ Skipped"
+            expected = "Self-check"
+        rows.append({
+            "Question": i,
+            "Your Answer": answer if question.get('type') == 'mcq' else ("Written" if answer is not None else ""),
+            "Correct Answer": expected,
+            "Result": outcome,
+            "Time (s)": int(spent or 0)
+        })
+
+    return {
+        "test_id": result.get('test_id'),
+        "submitted_at": result.get('submitted_at'),
+        "correct": correct,
+        "scored": scored,
+        "answered": answered,
+        "total": len(questions),
+        "percent": round(100 * correct / scored, 1) if scored else 0.0,
+        "elapsed": int(result.get('elapsed') or 0),
+        "timed_out": bool(result.get('timed_out')),
+        "rows": rows
+    }
+
+def display_attempt_results(summary):
+    """Score, time and the question-wise analysis of a scored attempt"""
+    st.markdown("### 📊 Test Performance")
+    if summary['timed_out']:
+        st.warning("⏰ Time ran out - the test was submitted automatically.")
+
+    minutes, seconds = divmod(summary['elapsed'], 60)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Score", f"{summary['correct']} / {summary['scored']}", f"{summary['percent']}%")
+    col2.metric("Answered", f"{summary['answered']} / {summary['total']}")
+    col3.metric("Time Taken", f"{minutes}:{seconds:02d}")
+
+    st.markdown("### 🔍 Question-wise Analysis")
+    st.table(summary['rows'])
@@ -0,0 +1,93 @@
+"""Compare Messages API tail latency with and without hedged requests
+
+Starts the local stand-in with a share of stalled responses and sends the
+same workload through a client without hedging and one with it, printing
+latency percentiles, hedges fired and won, and the extra requests paid for.
+
+Run from the repository root:
+    python benchmarks/bench_hedging.py [--requests 400 --rate-stall 0.03 --stall-seconds 5 --stream]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_claude_server
+from claude_client import ClaudeClient, HedgePolicy
+from metrics import REGISTRY
+from question_generator import build_generation_prompt, build_message_payload, build_prompt_prefix
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+def counter_value(name, **labels):
+    key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+    return REGISTRY.counter(name)._values.get(key, 0)
+
+def run_workload(client, payload, args):
+    def call(_):
+        started = time.perf_counter()
+        response = client.post_messages(payload, stream=args.stream, read_timeout=args.stall_seconds + 30)
+        if args.stream:
+            for _ in response.iter_lines():
+                pass
+        response.close()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        return list(executor.map(call, range(args.requests)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:0.15,0.3", help="Stand-in time to first byte spec")
+    parser.add_argument("--rate-stall", type=float, default=0.03)
+    parser.add_argument("--stall-seconds", type=float, default=5)
+    parser.add_argument("--stream", action="store_true", help="Stream completions (hedge on time to first byte)")
+    parser.add_argument("--percentile", type=float, default=95, help="Hedge after this percentile of recent latencies")
+    parser.add_argument("--max-rate", type=float, default=0.1, help="Maximum share of hedged calls")
+    parser.add_argument("--min-delay", type=float, default=0.1, help="Never hedge sooner than this")
+    args = parser.parse_args(argv)
+
+    config = mock_claude_server.ServerConfig(
+        latency=args.latency, rate_stall=args.rate_stall, stall_seconds=args.stall_seconds, seed=3
+    )
+    server = mock_claude_server.start_server(config, port=0)
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/v1/messages"
+
+    prompt = build_generation_prompt("CBSE", 10, "Mathematics", "Quadratic Equations", "Paper 1 (25 MCQs)", 5, 0, False, 1, 5, 1)
+    payload = build_message_payload(prompt, build_prompt_prefix("CBSE", 10, "Mathematics"))
+    if args.stream:
+        payload["stream"] = True
+    kind = "stream" if args.stream else "complete"
+
+    print(f"{'mode':<10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'sent':>6} {'fired':>6} {'won':>5} {'extra':>7}")
+    for hedge in (False, True):
+        client = ClaudeClient("sk-ant-api03-bench", api_url, hedge=hedge)
+        client.hedge_policy = HedgePolicy(args.percentile, args.max_rate, args.min_delay)
+        sent_before = config.stats.get("requests", 0)
+        fired_before = counter_value("mocktest_hedges_fired_total", kind=kind)
+        won_before = counter_value("mocktest_hedges_won_total", kind=kind)
+
+        latencies = run_workload(client, payload, args)
+
+        sent = config.stats.get("requests", 0) - sent_before
+        fired = counter_value("mocktest_hedges_fired_total", kind=kind) - fired_before
+        won = counter_value("mocktest_hedges_won_total", kind=kind) - won_before
+        print(
+            f"{'hedged' if hedge else 'plain':<10} {percentile(latencies, 50):>7.3f}s {percentile(latencies, 95):>7.3f}s "
+            f"{percentile(latencies, 99):>7.3f}s {max(latencies):>7.3f}s {sent:>6} {fired:>6} {won:>5} "
+            f"{(sent - args.requests) / args.requests:>7.1%}",
+            flush=True
+        )
+        client.close()
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Check json_extract against recorded malformed responses and time it on 30-question payloads
+
+Run from the repository root:
+    python benchmarks/bench_json_extract.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import extract_json
+from fixtures import make_paper_response
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "malformed_responses.jsonl")
+
+def load_corpus():
+    """Load the recorded responses"""
+    with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+        return [json.loads(line) for line in corpus_file if line.strip()]
+
+def check_corpus():
+    """Return the names of corpus entries that did not extract as recorded"""
+    failures = []
+    for entry in load_corpus():
+        try:
+            data, repairs = extract_json(entry["response"])
+        except ValueError:
+            failures.append(entry["name"])
+            continue
+        if len(data.get("questions", [])) != entry["expected_questions"] or sorted(repairs) != entry["expected_repairs"]:
+            failures.append(entry["name"])
+    return failures
+
+def time_call(fn, number=200, repeat=5):
+    """Best-of-repeat seconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+def run():
+    failures = check_corpus()
+    print(f"Corpus: {len(load_corpus()) - len(failures)}/{len(load_corpus())} responses extracted as recorded")
+    for name in failures:
+        print(f"  FAILED: {name}")
+
+    cases = {
+        "30 questions, fenced": make_paper_response(30),
+        "30 questions, fenced + trailing commas": make_paper_response(30, trailing_commas=True),
+        "30 questions, smart quotes": make_paper_response(30, smart_quotes=True),
+        "30 questions, raw newlines in strings": make_paper_response(30, raw_newlines=True),
+        "30 questions, all repairs": make_paper_response(30, trailing_commas=True, smart_quotes=True, raw_newlines=True),
+        "100 questions, fenced": make_paper_response(100)
+    }
+    for label, content in cases.items():
+        per_call = time_call(lambda: extract_json(content))
+        print(f"{label:<42} {len(content):>7} bytes  {per_call * 1e6:9.1f} µs/call")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(run())
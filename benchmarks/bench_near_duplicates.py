@@ -0,0 +1,110 @@
+"""Time near-duplicate index inserts and queries at 10k, 100k and 1M questions
+
+Run from the repository root:
+    python benchmarks/bench_near_duplicates.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from near_duplicates import NearDuplicateIndex, minhash_signature
+
+TEMPLATES = [
+    "What is the discriminant of {a}x² + {b}x + {c} = 0?",
+    "If the roots of x² - {b}x + {c} = 0 are α and β, what is α² + β²?",
+    "A train travels {a}{b} km in {c} hours. What is its average speed in km/h?",
+    "Find the {a}th term of the arithmetic progression {b}, {c}, ...",
+    "The area of a circle is {a}{b} cm². What is its radius to {c} decimal places?",
+    "How many moles of oxygen are needed to burn {a} moles of methane with {b}{c} g of water produced?",
+    "A {a} kg block slides down a {b}° incline with friction coefficient 0.{c}. Find its acceleration.",
+    "Simplify ({a}x + {b})({a}x - {c}) and state the coefficient of x."
+]
+
+# Rephrasings used to check that near-duplicates are found
+PARAPHRASES = [
+    ("What is the discriminant of", "Find the discriminant of"),
+    ("What is its average speed in km/h?", "Calculate the average speed in km/h."),
+    ("Find the", "Determine the"),
+    ("What is its radius", "Find the radius")
+]
+
+def make_questions(count, seed=7):
+    """Distinct synthetic questions: templates filled with varied numbers and a subject scope"""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        text = template.format(a=rng.randint(2, 999), b=rng.randint(2, 999), c=rng.randint(2, 999))
+        scope = ("cbse", 6 + i % 7, ("mathematics", "physics", "chemistry")[i % 3])
+        questions.append((text, scope))
+    return questions
+
+def paraphrase(text):
+    for original, replacement in PARAPHRASES:
+        if original in text:
+            return text.replace(original, replacement)
+    return text.rstrip("?.") + " ?"
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_size(size, query_count=2000):
+    questions = make_questions(size)
+
+    started = time.perf_counter()
+    signatures = [minhash_signature(text) for text, _ in questions]
+    signature_seconds = time.perf_counter() - started
+
+    index = NearDuplicateIndex()
+    started = time.perf_counter()
+    for key, ((_, scope), signature) in enumerate(zip(questions, signatures)):
+        index.add(key, signature=signature, scope=scope)
+    insert_seconds = time.perf_counter() - started
+
+    rng = random.Random(size)
+    sample = rng.sample(range(size), min(query_count, size))
+
+    started = time.perf_counter()
+    found = sum(
+        1 for key in sample
+        if any(match_key == key for match_key, _ in index.query(paraphrase(questions[key][0]), scope=questions[key][1]))
+    )
+    paraphrase_seconds = time.perf_counter() - started
+
+    # Fresh numbers make these new questions, so any match is a false positive
+    indexed_texts = {text for text, _ in questions}
+    fresh = [question for question in make_questions(len(sample), seed=size + 1) if question[0] not in indexed_texts]
+    started = time.perf_counter()
+    false_positives = sum(1 for text, scope in fresh if index.query(text, scope=scope))
+    fresh_seconds = time.perf_counter() - started
+
+    return {
+        "size": size,
+        "signature_us": signature_seconds / size * 1e6,
+        "insert_us": insert_seconds / size * 1e6,
+        "query_us": (paraphrase_seconds + fresh_seconds) / (len(sample) + len(fresh)) * 1e6,
+        "recall": found / len(sample),
+        "false_positive_rate": false_positives / len(fresh),
+        "max_rss_mb": max_rss_mb()
+    }
+
+def run(sizes):
+    print(f"{'questions':>10} {'signature':>11} {'insert':>10} {'query':>10} {'recall':>7} {'false +':>8} {'max RSS':>9}")
+    for size in sizes:
+        result = run_size(size)
+        print(
+            f"{result['size']:>10,} {result['signature_us']:>9.1f}µs {result['insert_us']:>8.1f}µs "
+            f"{result['query_us']:>8.1f}µs {result['recall']:>7.1%} {result['false_positive_rate']:>8.2%} "
+            f"{result['max_rss_mb']:>7.0f}MB",
+            flush=True
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    run(parser.parse_args().sizes)
@@ -0,0 +1,98 @@
+"""Compare check_topic_relevance against the linear keyword scan it replaced
+
+Checks that both give identical results for every corpus topic against every
+subject (plus edge cases and keyword fragments), then times both on the full
+keyword set.
+
+Run from the repository root:
+    python benchmarks/bench_topic_relevance.py [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import load_topics
+from topic_relevance import check_topic_relevance, get_enhanced_subject_keywords, get_keyword_automata
+
+EDGE_CASES = ["", " ", "   ", "pH", "DNA", "Cell", "a", "x", "\x00", "Quadratic\x00Equations",
+              "संधि", "  समास  ", "व्याकरण", "ध्वनि", "कारक", "सन्धिः", "Data Handling", "GRAPH"]
+
+def linear_check_topic_relevance(topic, subject):
+    """The previous implementation: scan every keyword of the subject on each call"""
+    if not topic or not subject:
+        return True, []
+    keywords_dict = get_enhanced_subject_keywords()
+    topic_clean = str(topic).lower().strip()
+    subject_keywords = list(keywords_dict.get(subject, []))
+    matches = False
+    for keyword in subject_keywords:
+        keyword_clean = str(keyword).lower()
+        if keyword_clean in topic_clean or topic_clean in keyword_clean:
+            matches = True
+    if not matches and subject == "Science":
+        for science_subject in ["Physics", "Chemistry", "Biology"]:
+            for keyword in keywords_dict.get(science_subject, []):
+                keyword_clean = str(keyword).lower()
+                if keyword_clean in topic_clean or topic_clean in keyword_clean:
+                    matches = True
+                    break
+            if matches:
+                break
+    if not matches and subject == "Mathematics":
+        for concept in ["hypothesis", "data", "analysis", "statistics", "probability", "graph", "chart"]:
+            if concept in topic_clean:
+                matches = True
+                break
+    return matches, subject_keywords
+
+def build_cases(seed=11):
+    keywords_dict = get_enhanced_subject_keywords()
+    subjects = list(keywords_dict) + ["Science", "Unknown Subject", ""]
+    topics = [topic for _, topic in load_topics()] + EDGE_CASES
+    rng = random.Random(seed)
+    for keywords in keywords_dict.values():
+        for keyword in rng.sample(keywords, min(len(keywords), 10)):
+            start = rng.randrange(len(keyword))
+            topics.append(keyword[start:rng.randrange(start, len(keyword)) + 1])
+            topics.append(f"Introduction to {keyword.upper()} and more")
+    return [(topic, subject) for topic in topics for subject in subjects]
+
+def time_calls(check, cases, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for topic, subject in cases:
+            check(topic, subject)
+    return time.perf_counter() - started
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    get_keyword_automata()
+    compile_seconds = time.perf_counter() - started
+
+    cases = build_cases()
+    mismatches = [
+        (topic, subject) for topic, subject in cases
+        if check_topic_relevance(topic, subject) != linear_check_topic_relevance(topic, subject)
+    ]
+    if mismatches:
+        print(f"{len(mismatches)} results differ, e.g. {mismatches[:5]}")
+        sys.exit(1)
+    print(f"{len(cases)} (topic, subject) pairs give identical results")
+
+    linear = time_calls(linear_check_topic_relevance, cases, args.repeat)
+    indexed = time_calls(check_topic_relevance, cases, args.repeat)
+    calls = len(cases) * args.repeat
+    print(f"compile once:  {compile_seconds * 1000:.1f} ms")
+    print(f"linear scan:   {linear / calls * 1e6:8.2f} us/call")
+    print(f"aho-corasick:  {indexed / calls * 1e6:8.2f} us/call  ({linear / indexed:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Shared benchmark fixtures: realistic papers, completions and the topic corpus"""
+import json
+import os
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+TOPICS_PATH = os.path.join(CORPUS_DIR, "topics.tsv")
+
+PAPER_SIZES = (25, 30, 100)
+
+def make_paper(question_count, short_count=0):
+    """Test data with question_count MCQs followed by short_count short answer questions"""
+    questions = []
+    for i in range(1, question_count + 1):
+        questions.append({
+            "question_number": i,
+            "type": "mcq",
+            "question": f"If the roots of x² - {i + 4}x + {i + 3} = 0 are α and β, what is the value of α² + β²?",
+            "options": {
+                "A": str((i + 4) ** 2 - 2 * (i + 3)),
+                "B": str((i + 4) ** 2),
+                "C": str((i + 4) ** 2 + 2 * (i + 3)),
+                "D": str(2 * (i + 3))
+            },
+            "correct_answer": "A",
+            "explanation": "Use α² + β² = (α + β)² - 2αβ with α + β and αβ read from the coefficients."
+        })
+    for i in range(question_count + 1, question_count + short_count + 1):
+        questions.append({
+            "question_number": i,
+            "type": "short_answer",
+            "question": f"Show that x² - {2 * i}x + {i * i} = 0 has equal roots and find them.",
+            "sample_answer": f"The discriminant is {4 * i * i} - {4 * i * i} = 0, so both roots equal {i}.",
+            "explanation": "Equal roots occur exactly when b² - 4ac = 0."
+        })
+
+    return {
+        "test_info": {
+            "board": "CBSE",
+            "grade": 10,
+            "subject": "Mathematics",
+            "topic": "Quadratic Equations",
+            "paper_type": "Paper 3 (more than 25)",
+            "total_questions": len(questions),
+            "show_answers_on_screen": False
+        },
+        "questions": questions
+    }
+
+def make_paper_response(question_count, fenced=True, trailing_commas=False, smart_quotes=False, raw_newlines=False):
+    """Build a realistic completion with question_count MCQs"""
+    content = json.dumps(make_paper(question_count), indent=4, ensure_ascii=False)
+
+    if trailing_commas:
+        content = content.replace('"\n        }', '",\n        }')
+    if smart_quotes:
+        content = content.replace('"correct_answer": "A"', '“correct_answer”: “A”')
+    if raw_newlines:
+        content = content.replace("(α + β)² - 2αβ with", "(α + β)² - 2αβ\nwith")
+    if fenced:
+        content = "Here is your test:\n```json\n" + content + "\n```\nGood luck!"
+    return content
+
+def load_topics():
+    """(subject, topic) pairs: every curriculum topic, then topics as users type them"""
+    topics = []
+    with open(TOPICS_PATH, encoding="utf-8") as topics_file:
+        for line in topics_file:
+            if line.startswith("#") or not line.strip():
+                continue
+            subject, topic = line.rstrip("\n").split("\t")
+            topics.append((subject, topic))
+    return topics
@@ -0,0 +1,234 @@
+"""CPU microbenchmarks for the code every Streamlit rerun or paper pays for
+
+Each case is timed asv-style: calls are batched until one batch takes at
+least --min-time, the batch is repeated and the best and median per-call
+times are kept. Results can be saved as a JSON baseline and later runs
+compared against it; a case slower than the baseline by more than
+--threshold is flagged as a regression and the exit code is 1.
+
+Run from the repository root:
+    python benchmarks/run_benchmarks.py --save benchmarks/baselines/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baselines/baseline.json --threshold 0.10
+    python benchmarks/run_benchmarks.py --filter pdf
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import PAPER_SIZES, make_paper, make_paper_response, load_topics
+
+BENCHMARKS = {}
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when an optional dependency is missing"""
+
+def benchmark(name):
+    """Register setup() returning the zero-argument callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+@benchmark("get_enhanced_subject_keywords")
+def setup_subject_keywords():
+    from topic_relevance import get_enhanced_subject_keywords
+    return get_enhanced_subject_keywords
+
+@benchmark("get_subjects_by_board")
+def setup_subjects_by_board():
+    from question_generator import get_subjects_by_board
+    return get_subjects_by_board
+
+@benchmark("check_topic_relevance[corpus]")
+def setup_topic_relevance():
+    from topic_relevance import check_topic_relevance
+    topics = load_topics()
+
+    def run():
+        for subject, topic in topics:
+            check_topic_relevance(topic, subject)
+    return run
+
+@benchmark("curriculum_ranker.confidence[corpus]")
+def setup_curriculum_ranker():
+    from question_generator import get_curriculum_ranker
+    ranker = get_curriculum_ranker()
+    topics = load_topics()
+
+    def run():
+        for subject, topic in topics:
+            ranker.confidence(topic, "CBSE", 10, subject)
+    return run
+
+def _quiet_streamlit_logs():
+    """Outside `streamlit run` every element call logs a missing-context warning"""
+    for logger_name in list(logging.root.manager.loggerDict):
+        if logger_name.startswith("streamlit"):
+            logging.getLogger(logger_name).setLevel(logging.CRITICAL)
+
+def _register_paper_benchmarks(size):
+    @benchmark(f"parse_test_response[{size}]")
+    def setup_parse():
+        from question_generator import parse_test_response
+        content = make_paper_response(size)
+        return lambda: parse_test_response(content)
+
+    @benchmark(f"parse_test_response[{size}, repaired]")
+    def setup_parse_repaired():
+        from question_generator import parse_test_response
+        content = make_paper_response(size, trailing_commas=True, smart_quotes=True, raw_newlines=True)
+        return lambda: parse_test_response(content)
+
+    @benchmark(f"display_generated_test[{size}]")
+    def setup_display():
+        try:
+            import streamlit  # noqa: F401
+        except ImportError:
+            raise SkipBenchmark("streamlit is not installed")
+        _quiet_streamlit_logs()
+        from mock_test_creator import display_generated_test
+        _quiet_streamlit_logs()
+        test_data = make_paper(size)
+        return lambda: display_generated_test(test_data)
+
+    @benchmark(f"create_questions_pdf[{size}]")
+    def setup_questions_pdf():
+        from pdf_export import PDF_AVAILABLE, build_questions_pdf
+        if not PDF_AVAILABLE:
+            raise SkipBenchmark("reportlab is not installed")
+        test_data = make_paper(size)
+        return lambda: build_questions_pdf(test_data, io.BytesIO())
+
+    @benchmark(f"create_answers_pdf[{size}]")
+    def setup_answers_pdf():
+        from pdf_export import PDF_AVAILABLE, build_answers_pdf
+        if not PDF_AVAILABLE:
+            raise SkipBenchmark("reportlab is not installed")
+        test_data = make_paper(size)
+        return lambda: build_answers_pdf(test_data, io.BytesIO())
+
+for paper_size in PAPER_SIZES:
+    _register_paper_benchmarks(paper_size)
+
+def time_case(fn, min_time=0.2, repeat=5):
+    """Best and median seconds per call, asv-style"""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+    samples = [elapsed / number] + [timer.timeit(number) / number for _ in range(repeat - 1)]
+    return {"min": min(samples), "median": statistics.median(samples), "number": number, "repeat": repeat}
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+def run_benchmarks(name_filter=None, min_time=0.2, repeat=5):
+    results = {}
+    skipped = {}
+    for name, setup in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+        try:
+            fn = setup()
+        except SkipBenchmark as e:
+            skipped[name] = str(e)
+            print(f"{name:<42} skipped: {e}", flush=True)
+            continue
+        result = time_case(fn, min_time, repeat)
+        results[name] = result
+        print(f"{name:<42} {format_seconds(result['min']):>12} (median {format_seconds(result['median'])})", flush=True)
+    return results, skipped
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline and return the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':<42} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            print(f"{name:<42} {'-':>12} {format_seconds(result['min']):>12} {'new':>7}")
+            continue
+        ratio = result["min"] / previous["min"] if previous["min"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ❌ REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  ✅ faster"
+        print(f"{name:<42} {format_seconds(previous['min']):>12} {format_seconds(result['min']):>12} {ratio:>6.2f}x{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the CPU microbenchmarks")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--save", help="Write results to this JSON baseline file")
+    parser.add_argument("--compare", help="Compare against this JSON baseline file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown flagged as a regression")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timed batch")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed batches per benchmark")
+    args = parser.parse_args(argv)
+
+    results, skipped = run_benchmarks(args.filter, args.min_time, args.repeat)
+
+    if args.save:
+        save_dir = os.path.dirname(args.save)
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as baseline_file:
+            json.dump({
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "machine": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine(),
+                    "cpus": os.cpu_count()
+                },
+                "results": results,
+                "skipped": skipped
+            }, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"\n💾 Saved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\n✅ No regressions above {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    exit_code = main()
+    print(f"({time.perf_counter() - started:.1f}s)")
+    sys.exit(exit_code)
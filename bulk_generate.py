@@ -0,0 +1,395 @@
+"""Generate papers in bulk without the Streamlit UI
+
+Jobs come from the curriculum map (every board/grade/subject/topic for the
+requested paper types) or from a CSV with board, grade, subject, topic and
+optional paper_type columns. Each finished paper is appended as one JSON line
+to the output file, so an interrupted run picks up where it stopped. Papers
+are also written to the shared response cache and question bank, which warms
+both for the app.
+
+Usage:
+    python bulk_generate.py --output papers.jsonl
+    python bulk_generate.py --output papers.jsonl --csv papers.csv --concurrency 8
+    python bulk_generate.py --output papers.jsonl --batch
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+import question_generator
+from question_generator import (
+    CLAUDE_MODEL, PROMPT_VERSION, GenerationError, get_subjects_by_board,
+    get_curriculum_specific_content, generate_paper, build_paper_prompts,
+    build_message_payload, parse_test_response, assemble_paper
+)
+from question_stream import salvage_questions
+from response_cache import make_cache_key, get_cached_response
+from claude_client import get_claude_client
+from usage_ledger import usage_context, record_call
+
+DEFAULT_PAPER_TYPES = ["Paper 1 (25 MCQs)"]
+DEFAULT_CONCURRENCY = 4
+PROGRESS_INTERVAL = 10  # seconds between progress lines
+
+# Message Batches API limits a batch to 100,000 requests; stay well below
+BATCH_MAX_REQUESTS = 10000
+BATCH_POLL_INTERVAL = 30
+
+# Usage ledger session for every paper of this run
+BULK_SESSION = f"bulk-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+def iter_curriculum_jobs(paper_types, boards=None):
+    """Yield one job per board/grade/subject/topic/paper type in the curriculum map"""
+    for board, grades in get_subjects_by_board().items():
+        if boards and board not in boards:
+            continue
+        for grade, subjects in grades.items():
+            for subject in subjects:
+                for topic in get_curriculum_specific_content(board, grade, subject):
+                    for paper_type in paper_types:
+                        yield {
+                            "board": board,
+                            "grade": grade,
+                            "subject": subject,
+                            "topic": topic,
+                            "paper_type": paper_type
+                        }
+
+def iter_csv_jobs(path, paper_types):
+    """Yield jobs from a CSV; rows without paper_type get every requested paper type"""
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        for row in csv.DictReader(csv_file):
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            if not all(row.get(field) for field in ("board", "grade", "subject", "topic")):
+                continue
+            for paper_type in ([row["paper_type"]] if row.get("paper_type") else paper_types):
+                yield {
+                    "board": row["board"],
+                    "grade": int(row["grade"]),
+                    "subject": row["subject"],
+                    "topic": row["topic"],
+                    "paper_type": paper_type
+                }
+
+def job_key(job):
+    """Cache key shared with the app, also used to resume the output file"""
+    return make_cache_key(
+        job["board"], job["grade"], job["subject"], job["topic"], job["paper_type"],
+        CLAUDE_MODEL, PROMPT_VERSION
+    )
+
+def load_completed_keys(output_path):
+    """Keys already written with status ok; a torn last line is ignored"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, encoding="utf-8") as output_file:
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                completed.add(record.get("key"))
+    return completed
+
+class ResultWriter:
+    """Append one JSON line per paper and keep the run's counters"""
+
+    def __init__(self, output_path, total, skipped):
+        self.output_path = output_path
+        self.total = total
+        self.skipped = skipped
+        self.ok = 0
+        self.cached = 0
+        self.errors = 0
+        self.questions = 0
+        self.started = time.monotonic()
+        self._last_progress = self.started
+        self._lock = threading.Lock()
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        # A torn line from a killed run must not swallow the next record
+        if os.path.exists(output_path) and os.path.getsize(output_path):
+            with open(output_path, "rb") as output_file:
+                output_file.seek(-1, os.SEEK_END)
+                needs_newline = output_file.read(1) != b"\n"
+        else:
+            needs_newline = False
+        self._file = open(output_path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def write(self, key, job, seconds, test_data=None, error=None, cached=False):
+        record = dict(job, key=key, seconds=round(seconds, 3))
+        if error is None:
+            record.update(status="ok", cached=cached, test_data=test_data)
+        else:
+            record.update(status="error", error=str(error))
+
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            if error is not None:
+                self.errors += 1
+            else:
+                self.ok += 1
+                self.cached += cached
+                self.questions += len(test_data.get("questions", []))
+            self._maybe_report()
+
+    @property
+    def done(self):
+        return self.ok + self.errors
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        if now - self._last_progress < PROGRESS_INTERVAL and self.done < self.total:
+            return
+        self._last_progress = now
+        elapsed = now - self.started
+        rate = self.done / elapsed * 60 if elapsed else 0
+        print(
+            f"[{elapsed:7.1f}s] {self.done}/{self.total} papers "
+            f"({self.errors} errors, {rate:.1f} papers/min)",
+            flush=True
+        )
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        error_rate = self.errors / self.done * 100 if self.done else 0
+        print("\n📊 Bulk generation summary")
+        print(f"  Papers written:   {self.ok} ({self.cached} from cache)")
+        print(f"  Skipped (resume): {self.skipped}")
+        print(f"  Errors:           {self.errors} ({error_rate:.1f}%)")
+        print(f"  Questions:        {self.questions}")
+        print(f"  Elapsed:          {elapsed:.1f}s")
+        if elapsed:
+            print(f"  Throughput:       {self.done / elapsed * 60:.1f} papers/min, {self.questions / elapsed:.1f} questions/s")
+
+    def close(self):
+        self._file.close()
+
+def generate_job(job, key, include_answers, use_cache):
+    """Return (test_data, cached) for one job; runs on a worker thread"""
+    if use_cache:
+        cached = get_cached_response(key)
+        if cached is not None:
+            return cached, True
+
+    with usage_context(session=BULK_SESSION):
+        test_data = generate_paper(
+            job["board"], job["grade"], job["subject"], job["topic"], job["paper_type"],
+            include_answers, key, use_bank=False
+        )
+    return test_data, False
+
+async def run_concurrent(jobs, writer, concurrency, include_answers, use_cache):
+    """Generate papers through the regular shard pipeline, concurrency papers at a time
+
+    Each paper still fans out into up to MAX_CONCURRENT_SHARDS requests, so
+    the upstream concurrency is roughly concurrency * MAX_CONCURRENT_SHARDS.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_job(key, job):
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                test_data, cached = await asyncio.to_thread(generate_job, job, key, include_answers, use_cache)
+            except GenerationError as e:
+                writer.write(key, job, time.monotonic() - started, error=e)
+            except Exception as e:
+                writer.write(key, job, time.monotonic() - started, error=f"{type(e).__name__}: {e}")
+            else:
+                writer.write(key, job, time.monotonic() - started, test_data=test_data, cached=cached)
+
+    await asyncio.gather(*(run_job(key, job) for key, job in jobs))
+
+def batches_url(messages_url):
+    return messages_url.rstrip("/") + "/batches"
+
+def submit_batch(client, messages_url, batch_requests):
+    response = client.session.post(
+        batches_url(messages_url), json={"requests": batch_requests},
+        timeout=(client.connect_timeout, client.read_timeout)
+    )
+    response.raise_for_status()
+    return response.json()
+
+def wait_for_batch(client, messages_url, batch, poll_interval):
+    """Poll a batch until processing has ended"""
+    while batch.get("processing_status") != "ended":
+        counts = batch.get("request_counts", {})
+        print(f"  batch {batch['id']}: {batch.get('processing_status')} {counts}", flush=True)
+        time.sleep(poll_interval)
+        response = client.session.get(
+            f"{batches_url(messages_url)}/{batch['id']}",
+            timeout=(client.connect_timeout, client.read_timeout)
+        )
+        response.raise_for_status()
+        batch = response.json()
+    return batch
+
+def iter_batch_results(client, batch):
+    response = client.session.get(
+        batch["results_url"], stream=True,
+        timeout=(client.connect_timeout, client.read_timeout)
+    )
+    response.raise_for_status()
+    for line in response.iter_lines():
+        if line.strip():
+            yield json.loads(line)
+
+def parse_batch_result(result):
+    """Shard test data from one batch result; truncated completions are salvaged"""
+    if result.get("type") != "succeeded":
+        error = result.get("error", {}).get("error", result.get("error", {}))
+        raise GenerationError(f"❌ Batch request {result.get('type')}: {error.get('message', 'no details')}")
+
+    message = result["message"]
+    record_call(message.get("usage"), message.get("model", CLAUDE_MODEL), kind="batch", batch=True)
+    content = "".join(block.get("text", "") for block in message.get("content", []) if block.get("type") == "text")
+    if message.get("stop_reason") == "max_tokens":
+        return {"test_info": {}, "questions": salvage_questions(content)}
+    return parse_test_response(content)
+
+def run_batch(jobs, writer, include_answers, poll_interval):
+    """Generate papers through the Message Batches API
+
+    Every shard becomes one batch request. Batch results have no follow-up
+    turn, so a shard cut off at max_tokens keeps only its complete questions
+    instead of being continued.
+    """
+    client = get_claude_client(question_generator.CLAUDE_API_KEY, question_generator.CLAUDE_API_URL)
+    messages_url = question_generator.CLAUDE_API_URL
+
+    pending = []
+    for key, job in jobs:
+        system_prompt, prompts = build_paper_prompts(
+            job["board"], job["grade"], job["subject"], job["topic"], job["paper_type"], include_answers
+        )
+        # custom_id is limited to 64 characters of [A-Za-z0-9_-]
+        custom_ids = [f"{key[:56]}-{index:03d}" for index in range(len(prompts))]
+        pending.append((key, job, custom_ids, [build_message_payload(prompt, system_prompt) for prompt in prompts]))
+
+    while pending:
+        chunk = []
+        request_count = 0
+        while pending and request_count + len(pending[0][2]) <= BATCH_MAX_REQUESTS:
+            chunk.append(pending.pop(0))
+            request_count += len(chunk[-1][2])
+        if not chunk:
+            chunk.append(pending.pop(0))
+
+        started = time.monotonic()
+        batch_requests = [
+            {"custom_id": custom_id, "params": params}
+            for _, _, custom_ids, payloads in chunk
+            for custom_id, params in zip(custom_ids, payloads)
+        ]
+        try:
+            batch = submit_batch(client, messages_url, batch_requests)
+            print(f"📦 Submitted batch {batch['id']} with {len(batch_requests)} requests", flush=True)
+            batch = wait_for_batch(client, messages_url, batch, poll_interval)
+            results = {item["custom_id"]: item["result"] for item in iter_batch_results(client, batch)}
+        except Exception as e:
+            for key, job, _, _ in chunk:
+                writer.write(key, job, time.monotonic() - started, error=f"Batch failed: {e}")
+            continue
+
+        seconds = time.monotonic() - started
+        for key, job, custom_ids, _ in chunk:
+            try:
+                with usage_context(session=BULK_SESSION, paper_id=f"{key}-{batch['id']}", board=job["board"],
+                                   grade=job["grade"], subject=job["subject"], topic=job["topic"],
+                                   paper_type=job["paper_type"]):
+                    shard_results = [
+                        parse_batch_result(results.get(custom_id, {"type": "missing"}))
+                        for custom_id in custom_ids
+                    ]
+                    test_data = assemble_paper(
+                        shard_results, job["board"], job["grade"], job["subject"], job["topic"], job["paper_type"], key
+                    )
+            except GenerationError as e:
+                writer.write(key, job, seconds, error=e)
+            else:
+                writer.write(key, job, seconds, test_data=test_data)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate mock test papers in bulk")
+    parser.add_argument("--output", required=True, help="JSONL file to append papers to (resumable)")
+    parser.add_argument("--csv", help="CSV with board, grade, subject, topic[, paper_type] columns")
+    parser.add_argument("--paper-type", action="append", dest="paper_types",
+                        help=f"Paper type to generate; repeatable (default: {DEFAULT_PAPER_TYPES[0]})")
+    parser.add_argument("--board", action="append", dest="boards", help="Only walk these boards of the curriculum map")
+    parser.add_argument("--limit", type=int, help="Stop after this many jobs")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Papers generated at once")
+    parser.add_argument("--include-answers", action="store_true", help="Mark papers to show answers on screen")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API instead of reusing cached papers")
+    parser.add_argument("--batch", action="store_true", help="Use the Message Batches API (cheaper, asynchronous)")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_INTERVAL, help="Seconds between batch status polls")
+    parser.add_argument("--api-url", help="Messages endpoint (default: CLAUDE_API_URL)")
+    parser.add_argument("--api-key", help="API key (default: CLAUDE_API_KEY)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.api_url:
+        question_generator.CLAUDE_API_URL = args.api_url
+    if args.api_key:
+        question_generator.CLAUDE_API_KEY = args.api_key
+    if not question_generator.CLAUDE_API_KEY:
+        print("❌ Set CLAUDE_API_KEY or pass --api-key", file=sys.stderr)
+        return 2
+
+    paper_types = args.paper_types or DEFAULT_PAPER_TYPES
+    if args.csv:
+        jobs = iter_csv_jobs(args.csv, paper_types)
+    else:
+        jobs = iter_curriculum_jobs(paper_types, args.boards)
+
+    completed = load_completed_keys(args.output)
+    pending = []
+    seen = set()
+    skipped = 0
+    for job in jobs:
+        key = job_key(job)
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in completed:
+            skipped += 1
+            continue
+        pending.append((key, job))
+        if args.limit and len(pending) >= args.limit:
+            break
+
+    print(f"🚀 {len(pending)} papers to generate, {skipped} already in {args.output}", flush=True)
+    writer = ResultWriter(args.output, len(pending), skipped)
+    try:
+        if args.batch:
+            run_batch(pending, writer, args.include_answers, args.poll_interval)
+        else:
+            asyncio.run(run_concurrent(pending, writer, max(args.concurrency, 1), args.include_answers, not args.no_cache))
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted - rerun the same command to resume", file=sys.stderr)
+    finally:
+        writer.close()
+        writer.summary()
+
+    return 1 if writer.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
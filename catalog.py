@@ -0,0 +1,210 @@
+"""Curriculum catalogs loaded from versioned JSON data files
+
+Each catalog in CATALOG_DIR is a JSON document with its name, the schema
+version it follows, a data version bumped on every edit, and its data.
+Catalogs are schema-checked, frozen into read-only mappings and tuples of
+interned strings, and loaded once per process. A file edited on disk is
+reloaded on the next lookup after CATALOG_RELOAD_SECONDS; a file that no
+longer passes the schema check is logged and the last good version kept.
+
+Usage:
+    python catalog.py   # schema-check every catalog file
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+# Catalog Configuration
+CATALOG_DIR = os.getenv(
+    "CATALOG_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogs")
+)
+# How often file modification times are checked; 0 checks on every lookup
+CATALOG_RELOAD_SECONDS = float(os.getenv("CATALOG_RELOAD_SECONDS", 2))
+CATALOG_SCHEMA_VERSION = 1
+
+# Key levels of each catalog's data, ending in a list of names
+CATALOG_SCHEMAS = {
+    "subjects_by_board": ("board", "grade"),
+    "curriculum": ("board", "subject", "grade"),
+    "subject_keywords": ("subject",)
+}
+
+_logger = logging.getLogger("mocktest.catalog")
+
+class CatalogError(ValueError):
+    """Raised when a catalog file is missing, unreadable or fails its schema check"""
+
+class Catalog:
+    """A loaded catalog: frozen data, reverse indexes and where it came from"""
+
+    def __init__(self, name, version, data, indexes, mtime_ns, size):
+        self.name = name
+        self.version = version
+        self.data = data
+        self.indexes = indexes
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checked_at = time.monotonic()
+
+def catalog_path(name):
+    return os.path.join(CATALOG_DIR, f"{name}.json")
+
+def _check_level(value, levels, path):
+    """Validate nested data against its key levels, returning it with grade keys as ints"""
+    if not levels:
+        if not isinstance(value, list):
+            raise CatalogError(f"{path}: expected a list of names")
+        for i, item in enumerate(value):
+            if not isinstance(item, str) or not item.strip():
+                raise CatalogError(f"{path}[{i}]: expected a non-empty string")
+        return value
+
+    if not isinstance(value, dict) or not value:
+        raise CatalogError(f"{path}: expected a non-empty object keyed by {levels[0]}")
+    checked = {}
+    for key, child in value.items():
+        if levels[0] == "grade":
+            if not key.isdigit() or not 1 <= int(key) <= 12:
+                raise CatalogError(f"{path}: grade keys must be 1-12, got {key!r}")
+            key = int(key)
+        elif not key.strip():
+            raise CatalogError(f"{path}: empty {levels[0]} key")
+        checked[key] = _check_level(child, levels[1:], f"{path}.{key}")
+    return checked
+
+def validate_catalog(name, document):
+    """Schema-check a parsed catalog document; returns (data version, data)"""
+    if name not in CATALOG_SCHEMAS:
+        raise CatalogError(f"Unknown catalog {name!r}")
+    if not isinstance(document, dict):
+        raise CatalogError(f"{name}: expected a JSON object")
+    if document.get("catalog") != name:
+        raise CatalogError(f"{name}: file is for catalog {document.get('catalog')!r}")
+    if document.get("schema_version") != CATALOG_SCHEMA_VERSION:
+        raise CatalogError(
+            f"{name}: schema_version {document.get('schema_version')!r} is not {CATALOG_SCHEMA_VERSION}"
+        )
+    version = document.get("version")
+    if not isinstance(version, int) or isinstance(version, bool) or version < 1:
+        raise CatalogError(f"{name}: version must be a positive integer")
+    return version, _check_level(document.get("data"), CATALOG_SCHEMAS[name], f"{name}.data")
+
+def freeze(value):
+    """Read-only copy: dicts become mappingproxies, lists tuples and strings are interned"""
+    if isinstance(value, dict):
+        return MappingProxyType({freeze(key): freeze(child) for key, child in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+def _normalize_topic(topic):
+    return " ".join(str(topic).lower().split())
+
+def build_indexes(name, data):
+    """Reverse indexes of a catalog's data"""
+    if name == "subjects_by_board":
+        # (board, subject) -> grades offering it, and subject -> grades on any board
+        subject_grades = {}
+        for board, grades in data.items():
+            for grade, subjects in grades.items():
+                for subject in subjects:
+                    subject_grades.setdefault((board, subject), []).append(grade)
+                    subject_grades.setdefault((None, subject), []).append(grade)
+        return {"subject_grades": freeze({key: sorted(set(grades)) for key, grades in subject_grades.items()})}
+    if name == "curriculum":
+        # normalized chapter -> (board, grade, subject) it appears in
+        topic_locations = {}
+        for board, subjects in data.items():
+            for subject, grades in subjects.items():
+                for grade, chapters in grades.items():
+                    for chapter in chapters:
+                        topic_locations.setdefault(_normalize_topic(chapter), []).append((board, grade, subject))
+        return {"topic_locations": MappingProxyType({key: tuple(value) for key, value in topic_locations.items()})}
+    return {}
+
+def load_catalog(name):
+    """Read, schema-check and freeze a catalog file"""
+    path = catalog_path(name)
+    try:
+        with open(path, "rb") as catalog_file:
+            stat = os.fstat(catalog_file.fileno())
+            document = json.loads(catalog_file.read().decode("utf-8"))
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"{name}: cannot read {path}: {e}") from e
+    version, data = validate_catalog(name, document)
+    data = freeze(data)
+    return Catalog(name, version, data, build_indexes(name, data), stat.st_mtime_ns, stat.st_size)
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+_revision = 0
+_revision_checked_at = float("-inf")
+
+def get_catalog(name):
+    """The loaded catalog, reloading it if its file changed since the last check"""
+    catalog = _catalogs.get(name)
+    if catalog is not None and time.monotonic() - catalog.checked_at < CATALOG_RELOAD_SECONDS:
+        return catalog
+
+    global _revision
+    with _catalogs_lock:
+        catalog = _catalogs.get(name)
+        if catalog is None:
+            catalog = _catalogs[name] = load_catalog(name)
+            _revision += 1
+            return catalog
+        try:
+            stat = os.stat(catalog_path(name))
+        except OSError as e:
+            _logger.warning("Keeping catalog %s version %s: %s", name, catalog.version, e)
+            stat = None
+        if stat is not None and (stat.st_mtime_ns, stat.st_size) != (catalog.mtime_ns, catalog.size):
+            try:
+                catalog = _catalogs[name] = load_catalog(name)
+                _revision += 1
+                _logger.info("Reloaded catalog %s version %s", name, catalog.version)
+            except CatalogError as e:
+                # Not re-read until the file changes again
+                catalog.mtime_ns, catalog.size = stat.st_mtime_ns, stat.st_size
+                _logger.warning("Keeping catalog %s version %s: %s", name, catalog.version, e)
+        catalog.checked_at = time.monotonic()
+        return catalog
+
+def catalog_revision():
+    """Counter bumped whenever any catalog is (re)loaded; key derived caches on it"""
+    global _revision_checked_at
+    if time.monotonic() - _revision_checked_at < CATALOG_RELOAD_SECONDS:
+        return _revision
+    for name in CATALOG_SCHEMAS:
+        get_catalog(name)
+    _revision_checked_at = time.monotonic()
+    return _revision
+
+def get_subject_grades(subject, board=None):
+    """Grades offering a subject on a board (or on any board)"""
+    return get_catalog("subjects_by_board").indexes["subject_grades"].get((board, subject), ())
+
+def find_topic_locations(topic):
+    """(board, grade, subject) of every curriculum chapter named like the topic"""
+    return get_catalog("curriculum").indexes["topic_locations"].get(_normalize_topic(topic), ())
+
+def main():
+    failed = False
+    for name in CATALOG_SCHEMAS:
+        try:
+            catalog = load_catalog(name)
+            print(f"✅ {name} version {catalog.version}: {catalog_path(name)}")
+        except CatalogError as e:
+            print(f"❌ {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import threading
+import time
+import os
+
+from metrics import inc
+
+# Circuit Breaker Configuration
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))  # consecutive failures that open it
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", 45))  # slower calls count as failures
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))  # wait before half-open probes
+# Probe calls let through at once while half-open; enough for one paper's concurrent shards
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", 4))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit is open"""
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, probing again after a cool-down
+
+    Closed: calls go through; CIRCUIT_FAILURE_THRESHOLD consecutive failures
+    (errors, or calls slower than CIRCUIT_SLOW_CALL_SECONDS) open the circuit.
+    Open: calls are rejected until CIRCUIT_OPEN_SECONDS have passed.
+    Half-open: up to CIRCUIT_HALF_OPEN_CALLS probe calls go through; the
+    first success closes the circuit and any failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=None, slow_call_seconds=None, open_seconds=None,
+                 half_open_calls=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.slow_call_seconds = slow_call_seconds or CIRCUIT_SLOW_CALL_SECONDS
+        self.open_seconds = open_seconds or CIRCUIT_OPEN_SECONDS
+        self.half_open_calls = half_open_calls or CIRCUIT_HALF_OPEN_CALLS
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 unless open)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError; admitted calls must report via record_*"""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_calls:
+                self._probes_in_flight += 1
+                return
+            inc("mocktest_circuit_rejections_total", circuit=self.name)
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self, seconds=0.0):
+        if seconds > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._failures = 0
+            self._probes_in_flight = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probes_in_flight = 0
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def _transition(self, state):
+        self._state = state
+        inc("mocktest_circuit_transitions_total", circuit=self.name, state=state)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name):
+    """Get the process-wide circuit breaker for an upstream"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
@@ -0,0 +1,392 @@
+import asyncio
+import contextvars
+import json
+import random
+import threading
+import time
+import weakref
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import span, record_span, inc
+from usage_ledger import record_call
+
+# httpx is optional - it backs the asyncio interface, with HTTP/2 when h2 is installed
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2
+    HTTP2_AVAILABLE = HTTPX_AVAILABLE
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Client Configuration
+CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+CONNECT_TIMEOUT = float(os.getenv("CLAUDE_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("CLAUDE_READ_TIMEOUT", 60))
+MAX_RETRIES = int(os.getenv("CLAUDE_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.getenv("CLAUDE_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("CLAUDE_BACKOFF_MAX", 20))
+RETRY_AFTER_MAX = float(os.getenv("CLAUDE_RETRY_AFTER_MAX", 30))
+POOL_SIZE = int(os.getenv("CLAUDE_POOL_SIZE", 32))
+USE_HTTP2 = os.getenv("CLAUDE_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Hedging: a call slower than HEDGE_PERCENTILE of recent calls gets a duplicate
+HEDGE_REQUESTS = os.getenv("CLAUDE_HEDGE", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("CLAUDE_HEDGE_PERCENTILE", 95))
+HEDGE_MAX_RATE = float(os.getenv("CLAUDE_HEDGE_MAX_RATE", 0.1))  # hedged share of recent calls
+HEDGE_MIN_DELAY = float(os.getenv("CLAUDE_HEDGE_MIN_DELAY", 0.5))
+HEDGE_MIN_SAMPLES = int(os.getenv("CLAUDE_HEDGE_MIN_SAMPLES", 20))
+HEDGE_WINDOW = int(os.getenv("CLAUDE_HEDGE_WINDOW", 500))
+
+# 429 rate limit, 529 overloaded, and transient server / gateway errors
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+def parse_retry_after(value):
+    """Parse a retry-after header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def compute_backoff(attempt, retry_after=None):
+    """Seconds to wait before retry number `attempt` (0-based)
+
+    Uses exponential backoff with full jitter, but never waits less than
+    the server's retry-after hint (capped at RETRY_AFTER_MAX).
+    """
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, RETRY_AFTER_MAX))
+    return delay
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        with span("connect", tls=False):
+            super().connect()
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        with span("connect", tls=True):
+            super().connect()
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that records a "connect" span whenever the pool opens a new connection"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool
+        }
+
+def record_response(response, elapsed_seconds):
+    """Count the response status and record time to first byte"""
+    inc("mocktest_http_responses_total", status=response.status_code)
+    record_span("ttfb", elapsed_seconds, status=response.status_code)
+
+def wait_before_retry(attempt, reason, retry_after=None):
+    """Back off before retry number `attempt`, recording the retry and the wait"""
+    inc("mocktest_http_retries_total", reason=reason)
+    delay = compute_backoff(attempt, retry_after)
+    record_span("retry_wait", delay, reason=reason, attempt=attempt + 1)
+    return delay
+
+class HedgePolicy:
+    """Recent latencies per kind of call, and a sliding-window cap on hedges
+
+    A call is hedged once it has run longer than `percentile` of recent
+    calls of its kind (never sooner than min_delay), as long as fewer than
+    max_rate of the last `window` calls were hedged.
+    """
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, max_rate=HEDGE_MAX_RATE, min_delay=HEDGE_MIN_DELAY,
+                 min_samples=HEDGE_MIN_SAMPLES, window=HEDGE_WINDOW):
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = {}
+        self._hedged = deque(maxlen=window)
+        self._window = window
+        self._lock = threading.Lock()
+
+    def observe(self, kind, seconds):
+        with self._lock:
+            self._latencies.setdefault(kind, deque(maxlen=self._window)).append(seconds)
+
+    def delay(self, kind):
+        """Seconds to wait before hedging a call of this kind, or None while samples are too few"""
+        with self._lock:
+            samples = sorted(self._latencies.get(kind, ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+        return max(samples[rank], self.min_delay)
+
+    def record(self, hedge):
+        """Count one call towards the hedge rate; returns whether it may be hedged"""
+        with self._lock:
+            if hedge and sum(self._hedged) + 1 > self.max_rate * (len(self._hedged) + 1):
+                hedge = False
+            self._hedged.append(hedge)
+            return hedge
+
+def _stream_usage(response):
+    """Usage from a streamed response's message_start event, read without waiting for the rest"""
+    for line in response.iter_lines():
+        if line.startswith(b"data:"):
+            event = json.loads(line[5:])
+            return (event.get("message") or {}).get("usage") if event.get("type") == "message_start" else None
+    return None
+
+def _settle_loser(future, payload, stream, started):
+    """Record a losing hedge's usage and release its response
+
+    A non-streamed loser has already run to completion upstream, so its full
+    usage is billed and recorded. A streamed loser is closed after its first
+    event, which drops the connection and stops the completion; only the
+    usage reported by then (the input tokens) is recorded.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    response = future.result()
+    try:
+        if response.status_code < 400:
+            usage = _stream_usage(response) if stream else response.json().get("usage")
+            record_call(usage, payload.get("model"), time.perf_counter() - started, response.status_code, kind="hedge")
+    except (requests.RequestException, ValueError):
+        pass
+    finally:
+        response.close()
+
+def _succeeded(future):
+    return future.exception() is None and future.result().status_code < 400
+
+class ClaudeClient:
+    """Messages API client sharing one keep-alive connection pool per process"""
+
+    def __init__(self, api_key, api_url=CLAUDE_API_URL, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES, http2=USE_HTTP2, hedge=HEDGE_REQUESTS):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.hedge = hedge
+        self.hedge_policy = HedgePolicy()
+        self._hedge_executor = None
+        self._hedge_executor_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers())
+
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def headers(self):
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+            "anthropic-version": ANTHROPIC_VERSION
+        }
+
+    def post_messages(self, payload, stream=False, read_timeout=None, max_retries=None, hedge=None):
+        """POST to the Messages API, retrying rate limits and transient failures
+
+        Returns the final response, which may still be an error status once
+        retries are exhausted. Connection failures are re-raised after the
+        last retry; read timeouts are not retried. With hedging (the client's
+        default unless `hedge` says otherwise) a slow call races a duplicate.
+        """
+        if self.hedge if hedge is None else hedge:
+            return self._post_hedged(payload, stream, read_timeout, max_retries)
+        return self._post_with_retries(payload, stream, read_timeout, max_retries)
+
+    def _post_with_retries(self, payload, stream=False, read_timeout=None, max_retries=None):
+        max_retries = self.max_retries if max_retries is None else max_retries
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+        attempt = 0
+
+        while True:
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=timeout, stream=stream)
+            except requests.ConnectionError:
+                if attempt >= max_retries:
+                    raise
+                time.sleep(wait_before_retry(attempt, "connection_error"))
+                attempt += 1
+                continue
+
+            # elapsed runs until the headers arrived, which for a non-streamed
+            # completion is also when generation finished
+            record_response(response, response.elapsed.total_seconds())
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            response.close()
+            time.sleep(wait_before_retry(attempt, response.status_code, retry_after))
+            attempt += 1
+
+    def _post_hedged(self, payload, stream, read_timeout, max_retries):
+        """Send the call, and a duplicate if it is slower than recent calls; the first success wins
+
+        For a streamed call "finished" means its headers arrived, so a call
+        stalled before its first token is hedged. The losing call is
+        cancelled if it has not started, and its response is closed when it
+        lands, which stops a streamed completion upstream. A non-streamed
+        loser's headers only arrive once its completion is done, so it always
+        runs to completion and is billed in full. Either way the loser's usage
+        is recorded in the usage ledger as a "hedge" call.
+        """
+        kind = "stream" if stream else "complete"
+        delay = self.hedge_policy.delay(kind)
+        started = time.perf_counter()
+
+        def submit():
+            # Each attempt runs in its own copy of the caller's context so its spans reach the trace
+            return self._get_hedge_executor().submit(
+                contextvars.copy_context().run, self._post_with_retries, payload, stream, read_timeout, max_retries
+            )
+
+        primary = submit()
+        if delay is None or wait([primary], timeout=delay).done:
+            hedged = self.hedge_policy.record(False)
+        else:
+            hedged = self.hedge_policy.record(True)
+
+        if not hedged:
+            response = primary.result()
+            self.hedge_policy.observe(kind, time.perf_counter() - started)
+            return response
+
+        inc("mocktest_hedges_fired_total", kind=kind)
+        hedge = submit()
+        pending = {primary, hedge}
+        winner = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in (primary, hedge) if future in done and _succeeded(future)), None)
+        # Both failed: report the original call's outcome
+        winner = winner or primary
+
+        for future in (primary, hedge):
+            if future is not winner:
+                future.cancel()
+                # Settle the loser with the caller's usage tags, whichever thread it lands on
+                context = contextvars.copy_context()
+                future.add_done_callback(
+                    lambda future, context=context: context.run(_settle_loser, future, payload, stream, started)
+                )
+
+        if winner is hedge:
+            inc("mocktest_hedges_won_total", kind=kind)
+        self.hedge_policy.observe(kind, time.perf_counter() - started)
+        return winner.result()
+
+    def _get_hedge_executor(self):
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="claude-hedge")
+            return self._hedge_executor
+
+    async def apost_messages(self, payload, read_timeout=None, max_retries=None):
+        """Async POST to the Messages API with the same retry policy
+
+        Uses a pooled httpx.AsyncClient (HTTP/2 when enabled) if httpx is
+        installed, otherwise runs the pooled sync client in a worker thread.
+        """
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(
+                self._post_with_retries, payload, False, read_timeout, max_retries
+            )
+
+        max_retries = self.max_retries if max_retries is None else max_retries
+        client = self._get_async_client()
+        timeout = httpx.Timeout(read_timeout or self.read_timeout, connect=self.connect_timeout)
+        attempt = 0
+
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await client.post(self.api_url, json=payload, timeout=timeout)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= max_retries:
+                    raise
+                await asyncio.sleep(wait_before_retry(attempt, "connection_error"))
+                attempt += 1
+                continue
+
+            record_response(response, time.perf_counter() - started)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            await asyncio.sleep(wait_before_retry(attempt, response.status_code, retry_after))
+            attempt += 1
+
+    def _get_async_client(self):
+        # httpx async clients are bound to the event loop they were created on
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                headers=self.headers(),
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the async client for the running event loop"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_claude_client(api_key, api_url=CLAUDE_API_URL):
+    """Get the process-wide client for an API key and URL"""
+    with _clients_lock:
+        client = _clients.get((api_key, api_url))
+        if client is None:
+            client = ClaudeClient(api_key, api_url)
+            _clients[(api_key, api_url)] = client
+        return client
@@ -0,0 +1,162 @@
+import heapq
+import math
+import os
+import re
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from keyword_index import normalize_keyword_text
+from topic_relevance import SCIENCE_SUBJECTS
+
+# Topics scoring at least this against a chapter or keyword count as relevant
+TOPIC_CONFIDENCE_THRESHOLD = float(os.getenv("TOPIC_CONFIDENCE_THRESHOLD", 0.35))
+# Chapters scoring at least this are named in the prompt as curriculum context
+CURRICULUM_CONTEXT_MIN_SCORE = float(os.getenv("CURRICULUM_CONTEXT_MIN_SCORE", 0.2))
+
+# Devanagari vowel signs and viramas are not \w, so the block is matched whole (minus the danda marks)
+WORD_PATTERN = re.compile(r"[\w\u0900-\u0963\u0966-\u097F]+")
+
+def tokenize(text):
+    """TF-IDF features of a text: its words, plus character trigrams of each word so typos still overlap"""
+    features = []
+    for word in WORD_PATTERN.findall(normalize_keyword_text(text)):
+        features.append(f"w:{word}")
+        padded = f" {word} "
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+class CurriculumRanker:
+    """TF-IDF cosine ranking of a free-text topic against every curriculum chapter and keyword
+
+    Documents are the chapters of every board/subject/grade in curriculum_map
+    and each keyword of subject_keywords. Document vectors are L2-normalized
+    and stored feature-major, so scoring a topic against all of them is one
+    product of the few rows its features touch with the query weights.
+    Without NumPy the same scores come from per-feature postings lists.
+    """
+
+    def __init__(self, curriculum_map, subject_keywords):
+        # (board, subject, grade, text, is_chapter); keywords have no board or grade
+        self.entries = []
+        for board, subjects in curriculum_map.items():
+            for subject, grades in subjects.items():
+                for grade, chapters in grades.items():
+                    self.entries.extend((board, subject, grade, chapter, True) for chapter in chapters)
+        for subject, keywords in subject_keywords.items():
+            self.entries.extend((None, subject, None, keyword, False) for keyword in keywords)
+
+        counts = [self._term_counts(entry[3]) for entry in self.entries]
+        document_frequency = {}
+        for term_counts in counts:
+            for term in term_counts:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        total = len(self.entries)
+        self.idf = {term: math.log((1 + total) / (1 + freq)) + 1 for term, freq in document_frequency.items()}
+        self.vocabulary = {term: index for index, term in enumerate(self.idf)}
+
+        # Per-feature postings: feature index -> [(entry index, weight)]
+        self._postings = [[] for _ in self.vocabulary]
+        for entry_index, term_counts in enumerate(counts):
+            for term, weight in self._normalized_weights(term_counts).items():
+                self._postings[self.vocabulary[term]].append((entry_index, weight))
+
+        if NUMPY_AVAILABLE:
+            self._matrix = np.zeros((len(self.vocabulary), total), dtype=np.float32)
+            for feature, postings in enumerate(self._postings):
+                for entry_index, weight in postings:
+                    self._matrix[feature, entry_index] = weight
+            self._boards = np.array([entry[0] or "" for entry in self.entries], dtype=object)
+            self._subjects = np.array([entry[1] for entry in self.entries], dtype=object)
+            self._grades = np.array([entry[2] or 0 for entry in self.entries])
+            self._is_chapter = np.array([entry[4] for entry in self.entries], dtype=bool)
+            self._masks = {}
+
+    def _term_counts(self, text):
+        term_counts = {}
+        for term in tokenize(text):
+            term_counts[term] = term_counts.get(term, 0) + 1
+        return term_counts
+
+    def _normalized_weights(self, term_counts):
+        """Unit-length TF-IDF weights of the known terms; unseen terms still count toward the length"""
+        unseen_idf = math.log(1 + len(self.entries)) + 1
+        weights = {
+            term: (1 + math.log(count)) * self.idf.get(term, unseen_idf)
+            for term, count in term_counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        if not norm:
+            return {}
+        return {term: weight / norm for term, weight in weights.items() if term in self.idf}
+
+    def _accepts(self, entry, board, grade, subject):
+        """Whether an entry belongs to the board, grade and subject (keywords match on subject only)"""
+        entry_board, entry_subject, entry_grade, _, is_chapter = entry
+        subjects = (subject, *SCIENCE_SUBJECTS) if subject == "Science" else (subject,)
+        if subject and entry_subject not in subjects:
+            return False
+        if is_chapter:
+            return (not board or entry_board == board) and (not grade or entry_grade == grade)
+        return True
+
+    def _mask(self, board, grade, subject):
+        """Boolean array of the entries _accepts, cached per board, grade and subject"""
+        key = (board, grade, subject)
+        if key not in self._masks:
+            self._masks[key] = self._build_mask(board, grade, subject)
+        return self._masks[key]
+
+    def _build_mask(self, board, grade, subject):
+        subjects = [subject, *SCIENCE_SUBJECTS] if subject == "Science" else [subject]
+        mask = np.isin(self._subjects, subjects) if subject else np.ones(len(self.entries), dtype=bool)
+        chapter_mask = np.ones(len(self.entries), dtype=bool)
+        if board:
+            chapter_mask &= self._boards == board
+        if grade:
+            chapter_mask &= self._grades == grade
+        return mask & (chapter_mask | ~self._is_chapter)
+
+    def scores(self, topic, board=None, grade=None, subject=None):
+        """(entry index, cosine score) of every matching entry sharing a feature with the topic"""
+        query = self._normalized_weights(self._term_counts(topic))
+        if not query:
+            return []
+        if NUMPY_AVAILABLE:
+            features = [self.vocabulary[term] for term in query]
+            scores = np.asarray(list(query.values()), dtype=np.float32) @ self._matrix[features]
+            candidates = np.flatnonzero((scores > 0) & self._mask(board, grade, subject))
+            return list(zip(candidates.tolist(), scores[candidates].tolist()))
+        totals = {}
+        for term, query_weight in query.items():
+            for entry_index, weight in self._postings[self.vocabulary[term]]:
+                totals[entry_index] = totals.get(entry_index, 0.0) + query_weight * weight
+        return [
+            (entry_index, score) for entry_index, score in totals.items()
+            if self._accepts(self.entries[entry_index], board, grade, subject)
+        ]
+
+    def rank(self, topic, board=None, grade=None, subject=None, limit=5, chapters_only=False):
+        """Best-matching entries as ((board, subject, grade, text), score), best first"""
+        scored = [
+            (score, -entry_index) for entry_index, score in self.scores(topic, board, grade, subject)
+            if self.entries[entry_index][4] or not chapters_only
+        ]
+        return [
+            (self.entries[-negative_index][:4], round(score, 3))
+            for score, negative_index in heapq.nlargest(limit, scored)
+        ]
+
+    def confidence(self, topic, board=None, grade=None, subject=None):
+        """Topic relevance in 0-1: its best cosine score against the subject's chapters and keywords"""
+        return max((round(score, 3) for _, score in self.scores(topic, board, grade, subject)), default=0.0)
+
+    def curriculum_context(self, topic, board, grade, subject, limit=3):
+        """Names of the chapters of this board/grade/subject closest to the topic"""
+        return [
+            entry[3] for entry, score in self.rank(topic, board, grade, subject, limit, chapters_only=True)
+            if score >= CURRICULUM_CONTEXT_MIN_SCORE
+        ]
@@ -0,0 +1,128 @@
+import json
+import re
+
+class JSONExtractionError(ValueError):
+    """Raised when no JSON object can be recovered from a completion"""
+
+_decoder = json.JSONDecoder()
+
+# Start of a JSON object: "{" followed by a key, a smart-quoted key, or "}"
+_OBJECT_START_RE = re.compile(r'\{\s*["“”}]')
+
+_SMART_QUOTE_RE = re.compile(r'[“”]')
+_TRAILING_COMMA_RE = re.compile(r',(?=\s*[}\]])')
+
+# Accepts raw control characters (e.g. newlines) inside strings
+_lenient_decoder = json.JSONDecoder(strict=False)
+
+def _in_string_flags(text, positions):
+    """Yield whether each (ascending) position falls inside a JSON string
+
+    Uses the parity of unescaped double quotes before the position, counted
+    with str.count so the scan stays in C. An escaped backslash directly
+    before a closing quote is miscounted; such replies fall through to the
+    final decode error.
+    """
+    quotes = 0
+    last = 0
+    for pos in positions:
+        quotes += text.count('"', last, pos) - text.count('\\"', last, pos)
+        last = pos
+        yield quotes % 2 == 1
+
+def _replace_smart_quotes(text):
+    """Replace smart quotes used as delimiters, i.e. next to { [ , : or } ]"""
+    parts = []
+    prev = 0
+    for match in _SMART_QUOTE_RE.finditer(text):
+        pos = match.start()
+
+        before = pos - 1
+        while before >= 0 and text[before] in " \t\r\n":
+            before -= 1
+        after = pos + 1
+        while after < len(text) and text[after] in " \t\r\n":
+            after += 1
+
+        if (before >= 0 and text[before] in "{[,:") or (after < len(text) and text[after] in ":,}]"):
+            parts.append(text[prev:pos])
+            parts.append('"')
+            prev = pos + 1
+
+    parts.append(text[prev:])
+    return "".join(parts)
+
+def _remove_trailing_commas(text):
+    positions = [match.start() for match in _TRAILING_COMMA_RE.finditer(text)]
+    parts = []
+    prev = 0
+    for pos, inside_string in zip(positions, _in_string_flags(text, positions)):
+        if not inside_string:
+            parts.append(text[prev:pos])
+            prev = pos + 1
+    parts.append(text[prev:])
+    return "".join(parts)
+
+def extract_json(text):
+    """Extract the outermost JSON object from a completion
+
+    Leading prose, code fences and trailing commentary are skipped. If the
+    object does not parse as-is, targeted repairs are applied for smart
+    quotes and trailing commas, and raw control characters inside strings
+    are accepted.
+
+    Returns (data, repairs) where repairs lists the fixes that were applied.
+    Raises JSONExtractionError when nothing can be recovered.
+    """
+    match = _OBJECT_START_RE.search(text)
+    if match is None:
+        raise JSONExtractionError("No JSON object found")
+
+    start = match.start()
+    candidate = text[start:]
+    repairs = []
+
+    if text[:start].strip():
+        repairs.append("stripped_surrounding_text")
+
+    # Each repair runs only if the previous attempt still fails to decode
+    try:
+        data, end = _decoder.raw_decode(candidate)
+    except ValueError as e:
+        error = e
+    else:
+        return data, _finish(repairs, candidate, end)
+
+    if "“" in candidate or "”" in candidate:
+        unrepaired = candidate
+        candidate = _replace_smart_quotes(candidate)
+        if candidate != unrepaired:
+            repairs.append("replaced_smart_quotes")
+
+    unrepaired_length = len(candidate)
+    candidate = _remove_trailing_commas(candidate)
+    if len(candidate) != unrepaired_length:
+        repairs.append("removed_trailing_commas")
+
+    try:
+        data, end = _decoder.raw_decode(candidate)
+    except ValueError as e:
+        error = e
+    else:
+        return data, _finish(repairs, candidate, end)
+
+    if "control character" in str(error):
+        try:
+            data, end = _lenient_decoder.raw_decode(candidate)
+        except ValueError as e:
+            error = e
+        else:
+            repairs.append("accepted_control_characters")
+            return data, _finish(repairs, candidate, end)
+
+    raise JSONExtractionError(f"Could not repair JSON: {error}")
+
+def _finish(repairs, candidate, end):
+    if candidate[end:].strip() and "stripped_surrounding_text" not in repairs:
+        repairs.insert(0, "stripped_surrounding_text")
+    return repairs
@@ -0,0 +1,203 @@
+import heapq
+import threading
+import unicodedata
+
+def normalize_keyword_text(text):
+    """Compose Unicode (NFC, so Devanagari matras and nuktas compare equal) and lowercase"""
+    return unicodedata.normalize("NFC", str(text)).lower()
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a keyword list
+
+    Finds which keywords occur in a text with one pass over the text,
+    however many keywords there are. Keywords are normalized with
+    normalize_keyword_text; texts passed in must be normalized the same way.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = [normalize_keyword_text(keyword) for keyword in keywords]
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [()]
+        self._matches_empty = "" in self.keywords
+
+        for keyword in dict.fromkeys(self.keywords):
+            if not keyword:
+                continue
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append(())
+                node = next_node
+            self._outputs[node] = (keyword,)
+
+        # Breadth-first fail links; each node also reports the keywords ending at its suffixes
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0) if node else 0
+                self._outputs[child] += self._outputs[self._fail[child]]
+                queue.append(child)
+
+        # Separator that cannot appear in a keyword, for the reverse substring test
+        self._joined = "\x00".join(self.keywords)
+
+    def contains_any(self, text):
+        """Whether any keyword occurs in text; stops at the first hit"""
+        if self._matches_empty:
+            return True
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                return True
+        return False
+
+    def find_all(self, text):
+        """Keywords occurring in text, in the order their matches end"""
+        found = {}
+        if self._matches_empty:
+            found[""] = None
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword in outputs[node]:
+                found[keyword] = None
+        return list(found)
+
+    def within_keyword(self, text):
+        """Whether text occurs inside any keyword"""
+        if not self.keywords:
+            return False
+        if "\x00" in text:
+            return any(text in keyword for keyword in self.keywords)
+        return text in self._joined
+
+    def matches(self, text):
+        """Whether a keyword occurs in text or text occurs in a keyword"""
+        return self.contains_any(text) or self.within_keyword(text)
+
+def trigrams(text):
+    """Character trigrams of text, padded so word starts and ends count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Fuzzy lookup of the terms closest to a possibly misspelled text
+
+    Terms are scored by the Dice coefficient of their character trigrams, so
+    "quadratik equations" still ranks "Quadratic Equations" first. Only terms
+    sharing a trigram with the text are scored.
+    """
+
+    def __init__(self, terms):
+        self.terms = []
+        self._sizes = []
+        self._postings = {}
+        seen = set()
+        for term in terms:
+            normalized = normalize_keyword_text(term).strip()
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            grams = trigrams(normalized)
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(term_id)
+
+    def search(self, text, limit=8, min_score=0.3):
+        """Up to limit (term, score) pairs, best first, with score in 0-1"""
+        normalized = normalize_keyword_text(text).strip()
+        if not normalized:
+            return []
+        grams = trigrams(normalized)
+        shared = {}
+        for gram in grams:
+            for term_id in self._postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        scored = []
+        for term_id, count in shared.items():
+            score = 2 * count / (len(grams) + self._sizes[term_id])
+            if score >= min_score:
+                scored.append((score, -term_id))
+        # Ties keep term order, so earlier (curriculum) terms come first
+        return [(self.terms[-negative_id], round(score, 3)) for score, negative_id in heapq.nlargest(limit, scored)]
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+class PrefixTrie:
+    """Typeahead completions ranked by popularity
+
+    Each term is reachable from the start of any of its words, so "equa"
+    completes "Quadratic Equations". Every node keeps its `limit` most popular
+    terms, so a lookup only walks the prefix. Popularity only ever grows,
+    which keeps those per-node lists exact as terms are added.
+    One trie is shared by every session, so adds are serialized and each
+    node's list is replaced whole rather than sorted in place under a reader.
+    """
+
+    def __init__(self, terms=(), limit=10):
+        self.limit = limit
+        self._root = _TrieNode()
+        self._terms = {}  # normalized term -> [display term, popularity]
+        self._lock = threading.Lock()
+        for term, popularity in terms:
+            self.add(term, popularity)
+
+    def _rank(self, key):
+        term, popularity = self._terms[key]
+        return -popularity, len(key), key
+
+    def add(self, term, popularity=1):
+        """Add a term or raise the popularity of an existing one"""
+        key = " ".join(normalize_keyword_text(term).split())
+        if not key:
+            return
+        with self._lock:
+            if key in self._terms:
+                self._terms[key][1] += popularity
+            else:
+                self._terms[key] = [term, popularity]
+
+            starts = [0] + [i + 1 for i, char in enumerate(key) if char == " "]
+            self._promote(self._root, key)
+            for start in starts:
+                node = self._root
+                for char in key[start:]:
+                    node = node.children.setdefault(char, _TrieNode())
+                    self._promote(node, key)
+
+    def _promote(self, node, key):
+        top = node.top if key in node.top else node.top + [key]
+        node.top = sorted(top, key=self._rank)[:self.limit]
+
+    def complete(self, prefix, limit=None):
+        """Most popular (term, popularity) pairs with a word starting with prefix (all terms for "")"""
+        node = self._root
+        for char in " ".join(normalize_keyword_text(prefix).split()):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        with self._lock:
+            return [tuple(self._terms[key]) for key in node.top[:limit or self.limit]]
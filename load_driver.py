@@ -0,0 +1,200 @@
+"""Simulate concurrent users going create → generate → PDF and report latency per stage
+
+Each simulated user repeatedly picks a board/grade/subject/topic from the
+curriculum map. It runs the create-form checks (topic relevance and the API
+connection test), generates a fresh paper through the regular shard
+pipeline, and builds both PDFs in memory. The response cache and question
+bank are pointed at a temporary directory, so every paper goes upstream.
+
+Usage:
+    python load_driver.py --users 20 --papers-per-user 3 --start-server --latency lognormal:0.8,0.5 --tokens-per-second 200
+    python load_driver.py --users 5 --api-url http://127.0.0.1:8765/v1/messages
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import question_generator
+import response_cache
+import question_bank
+from question_generator import (
+    GenerationError, get_subjects_by_board, get_curriculum_specific_content, generate_paper
+)
+from response_cache import make_cache_key
+from topic_relevance import check_topic_relevance
+from pdf_export import PDF_AVAILABLE, build_questions_pdf, build_answers_pdf
+import mock_claude_server
+
+STAGES = ["create", "generate", "pdf", "total"]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+class StageTimings:
+    """Thread-safe durations and error counts per stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {stage: [] for stage in STAGES}
+        self.errors = {stage: 0 for stage in STAGES}
+        self.error_messages = {}
+        self.questions = 0
+
+    def record(self, stage, seconds, error=None):
+        with self._lock:
+            if error is None:
+                self.durations[stage].append(seconds)
+            else:
+                self.errors[stage] += 1
+                message = str(error)[:120]
+                self.error_messages[message] = self.error_messages.get(message, 0) + 1
+
+    def add_questions(self, count):
+        with self._lock:
+            self.questions += count
+
+def pick_paper(rng, paper_type):
+    """Random board/grade/subject/topic from the curriculum map"""
+    catalog = [
+        (board, grade, subject)
+        for board, grades in get_subjects_by_board().items()
+        for grade, subjects in grades.items()
+        for subject in subjects
+        if get_curriculum_specific_content(board, grade, subject)
+    ]
+    board, grade, subject = rng.choice(catalog)
+    topic = rng.choice(get_curriculum_specific_content(board, grade, subject))
+    return board, grade, subject, topic, paper_type
+
+def run_user(user_id, args, timings):
+    rng = random.Random(args.seed + user_id if args.seed is not None else None)
+
+    for _ in range(args.papers_per_user):
+        board, grade, subject, topic, paper_type = pick_paper(rng, args.paper_type)
+        paper_started = time.perf_counter()
+
+        # Create: what the form does before it asks for a paper
+        started = time.perf_counter()
+        check_topic_relevance(topic, subject)
+        working, message = question_generator.test_claude_api()
+        timings.record("create", time.perf_counter() - started, None if working else message)
+        if not working:
+            timings.record("total", 0, message)
+            continue
+
+        started = time.perf_counter()
+        try:
+            cache_key = make_cache_key(board, grade, subject, topic, paper_type, question_generator.CLAUDE_MODEL, f"load-{time.time_ns()}")
+            on_question = (lambda question: None) if args.stream else None
+            test_data = generate_paper(
+                board, grade, subject, topic, paper_type, False, cache_key,
+                on_question, use_bank=False
+            )
+        except GenerationError as e:
+            timings.record("generate", time.perf_counter() - started, e)
+            timings.record("total", 0, e)
+            continue
+        timings.record("generate", time.perf_counter() - started)
+        timings.add_questions(len(test_data['questions']))
+
+        if PDF_AVAILABLE:
+            started = time.perf_counter()
+            try:
+                build_questions_pdf(test_data, io.BytesIO())
+                build_answers_pdf(test_data, io.BytesIO())
+            except Exception as e:
+                timings.record("pdf", time.perf_counter() - started, e)
+                timings.record("total", 0, e)
+                continue
+            timings.record("pdf", time.perf_counter() - started)
+
+        timings.record("total", time.perf_counter() - paper_started)
+
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+def print_report(timings, elapsed, args):
+    print(f"\n📊 {args.users} users × {args.papers_per_user} papers of {args.paper_type} in {elapsed:.1f}s")
+    print(f"{'stage':<10} {'ok':>6} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'per min':>9}")
+    for stage in STAGES:
+        durations = timings.durations[stage]
+        if not durations and not timings.errors[stage]:
+            continue
+        print(
+            f"{stage:<10} {len(durations):>6} {timings.errors[stage]:>7} "
+            f"{percentile(durations, 50):>8.3f}s {percentile(durations, 95):>8.3f}s "
+            f"{percentile(durations, 99):>8.3f}s {max(durations, default=0):>8.3f}s "
+            f"{len(durations) / elapsed * 60:>9.1f}"
+        )
+    if not PDF_AVAILABLE:
+        print("  (pdf stage skipped: reportlab is not installed)")
+    print(f"Questions generated: {timings.questions} ({timings.questions / elapsed:.1f}/s)")
+
+    if timings.error_messages:
+        print("Errors:")
+        for message, count in sorted(timings.error_messages.items(), key=lambda item: -item[1]):
+            print(f"  {count:>5} × {message}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the create → generate → PDF path")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--papers-per-user", type=int, default=3)
+    parser.add_argument("--paper-type", default="Paper 1 (25 MCQs)")
+    parser.add_argument("--think-time", type=float, default=0, help="Mean seconds a user waits between papers")
+    parser.add_argument("--stream", action="store_true", help="Stream completions like the live display")
+    parser.add_argument("--api-url", help="Messages endpoint to load (default: CLAUDE_API_URL)")
+    parser.add_argument("--api-key", default=None, help="API key (default: CLAUDE_API_KEY, or a dummy key with --start-server)")
+    parser.add_argument("--start-server", action="store_true", help="Run the local stand-in server in-process")
+    mock_claude_server.add_server_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    server = None
+    if args.start_server:
+        server = mock_claude_server.start_server(mock_claude_server.config_from_args(args), port=0)
+        question_generator.CLAUDE_API_URL = f"http://127.0.0.1:{server.server_address[1]}/v1/messages"
+        question_generator.CLAUDE_API_KEY = args.api_key or "sk-ant-api03-load-test"
+    else:
+        if args.api_url:
+            question_generator.CLAUDE_API_URL = args.api_url
+        if args.api_key:
+            question_generator.CLAUDE_API_KEY = args.api_key
+    if not question_generator.CLAUDE_API_KEY:
+        print("❌ Set CLAUDE_API_KEY, pass --api-key or use --start-server", file=sys.stderr)
+        return 2
+
+    # Keep load-test papers out of the real cache and bank
+    scratch_dir = tempfile.mkdtemp(prefix="load_driver_")
+    response_cache.RESPONSE_CACHE_PATH = os.path.join(scratch_dir, "response_cache.db")
+    question_bank.QUESTION_BANK_PATH = os.path.join(scratch_dir, "question_bank.db")
+
+    print(f"🚀 Loading {question_generator.CLAUDE_API_URL} with {args.users} users", flush=True)
+    timings = StageTimings()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(args.users, 1)) as executor:
+        for future in [executor.submit(run_user, user_id, args, timings) for user_id in range(args.users)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    print_report(timings, elapsed, args)
+    if server is not None:
+        print(f"Stand-in server: {server.config.stats}")
+        server.shutdown()
+
+    return 1 if any(timings.errors.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Metrics Configuration
+METRICS_PORT = os.getenv("METRICS_PORT", "")  # e.g. 9464; empty disables the endpoint
+METRICS_JSON_LOGS = os.getenv("METRICS_JSON_LOGS", "false").lower() in ("1", "true", "yes")
+
+# Stage latencies range from sub-millisecond parsing to minute-long generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_HISTOGRAM = "mocktest_stage_duration_seconds"
+
+METRIC_HELP = {
+    STAGE_HISTOGRAM: "Time spent in each stage of generating, rendering and exporting a paper",
+    "mocktest_cache_requests_total": "Response cache lookups by result",
+    "mocktest_bank_questions_total": "Questions placed in papers by source",
+    "mocktest_http_responses_total": "Messages API responses by HTTP status",
+    "mocktest_http_retries_total": "Messages API retries by reason",
+    "mocktest_parse_failures_total": "Completions that could not be parsed",
+    "mocktest_json_repairs_total": "Repairs applied to completions by kind",
+    "mocktest_continuations_total": "Follow-up requests for completions cut off at max_tokens",
+    "mocktest_backfill_questions_total": "Questions generated again to replace near-duplicates and failed shards of a paper",
+    "mocktest_shard_failures_total": "Paper shards whose generation failed and was left to the backfill",
+    "mocktest_hedges_fired_total": "Duplicate requests sent for slow Messages API calls",
+    "mocktest_hedges_won_total": "Hedged calls answered first by the duplicate",
+    "mocktest_circuit_transitions_total": "Circuit breaker state changes",
+    "mocktest_circuit_rejections_total": "Calls rejected without reaching upstream while a circuit was open",
+    "mocktest_library_papers_served_total": "Stored papers served while live generation was unavailable",
+    "mocktest_attempts_submitted_total": "Attempts submitted from the in-browser attempt mode",
+    "mocktest_topic_trie_errors_total": "Generated topics that could not be added to the typeahead trie"
+}
+
+_logger = logging.getLogger("mocktest.metrics")
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory(name, METRIC_HELP.get(name, name))
+            return metric
+
+    def counter(self, name):
+        return self._get(name, Counter)
+
+    def histogram(self, name):
+        return self._get(name, Histogram)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# Spans of the paper being generated in this context; copied into shard worker threads
+_current_spans = contextvars.ContextVar("mocktest_spans", default=None)
+
+def _log_event(event):
+    if not METRICS_JSON_LOGS:
+        return
+    if not _logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+    _logger.info(json.dumps(event, ensure_ascii=False, default=str))
+
+def record_span(stage, seconds, **fields):
+    """Record a finished stage: histogram, current paper's spans and a JSON log line"""
+    REGISTRY.histogram(STAGE_HISTOGRAM).observe(seconds, stage=stage)
+
+    span_record = {"stage": stage, "seconds": seconds, "started": time.time() - seconds}
+    span_record.update(fields)
+    spans = _current_spans.get()
+    if spans is not None:
+        spans.append(span_record)
+
+    _log_event(dict(span_record, event="span", ts=time.time(), thread=threading.current_thread().name))
+
+@contextmanager
+def span(stage, **fields):
+    """Time the enclosed block as one stage; an exception is recorded as error=<type>"""
+    started = time.perf_counter()
+    try:
+        yield fields
+    except BaseException as e:
+        fields.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        record_span(stage, time.perf_counter() - started, **fields)
+
+@contextmanager
+def collect_spans(spans=None):
+    """Collect every span recorded in this context (and tasks copied from it) into a list"""
+    spans = [] if spans is None else spans
+    token = _current_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_spans.reset(token)
+
+def inc(name, amount=1, **labels):
+    """Increment a counter and log it"""
+    REGISTRY.counter(name).inc(amount, **labels)
+    _log_event(dict(labels, event="counter", name=name, amount=amount, ts=time.time()))
+
+def summarize_spans(spans):
+    """Per-stage count, total and latest seconds, in the order stages first ran"""
+    summary = {}
+    for span_record in spans:
+        stage = summary.setdefault(span_record["stage"], {"stage": span_record["stage"], "count": 0, "total": 0.0, "last": 0.0})
+        stage["count"] += 1
+        stage["total"] += span_record["seconds"]
+        stage["last"] = span_record["seconds"]
+    return list(summary.values())
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """Serve /metrics on a side port once per process; returns the server or None
+
+    Does nothing when no port is configured. When another worker process
+    already owns the port the error is logged and the app carries on.
+    """
+    global _server
+
+    port = port or METRICS_PORT
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                _logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
@@ -0,0 +1,587 @@
+"""Local stand-in for the Claude Messages API for load tests and offline development
+
+Serves POST /v1/messages as JSON or as a server-sent event stream, and the
+Message Batches endpoints used by bulk_generate.py. Completions are canned
+but realistic papers built from the counts and topic in the prompt. Latency,
+token rate, stalled responses, 429/529/5xx errors and truncated or malformed
+output can all be injected.
+
+Usage:
+    python mock_claude_server.py --port 8765 --latency lognormal:0.8,0.5 --tokens-per-second 80 \\
+        --rate-429 0.05 --rate-529 0.02 --rate-5xx 0.01 --rate-truncated 0.05 --rate-malformed 0.1 \\
+        --rate-stall 0.02 --stall-seconds 20
+
+Then point the app or the load driver at it:
+    CLAUDE_API_URL=http://127.0.0.1:8765/v1/messages CLAUDE_API_KEY=sk-ant-api03-local streamlit run main.py
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+CHARS_PER_TOKEN = 4
+# Like the real API, only marked system prompts of at least this many tokens are cached
+PROMPT_CACHE_MIN_TOKENS = 1024
+STREAM_CHUNK_TOKENS = 8
+
+_MCQ_COUNT_RE = re.compile(r"Generate (\d+) difficult multiple choice")
+_SHORT_COUNT_RE = re.compile(r"Generate (\d+) challenging short answer")
+_PAPER_RE = re.compile(r'Create a challenging (.+?) Grade (\d+) (.+?) test on "([^"]+)"')
+_FIRST_NUMBER_RE = re.compile(r"starting at (\d+)")
+_PAPER_TYPE_RE = re.compile(r'paper type "([^"]+)"')
+
+# Question templates by subject; numbers are filled in so every question differs
+MCQ_TEMPLATES = {
+    "Mathematics": [
+        ("What is the discriminant of {a}x² + {b}x + {c} = 0?", "{d1}", "Use b² - 4ac."),
+        ("If the roots of x² - {b}x + {c} = 0 are α and β, what is α² + β²?", "{d2}", "α² + β² = (α + β)² - 2αβ."),
+        ("Find the {a}th term of the arithmetic progression {b}, {bc}, ...", "{d3}", "aₙ = a + (n - 1)d."),
+        ("What is the sum of the first {a} natural numbers multiplied by {c}?", "{d4}", "Sum = n(n + 1)/2.")
+    ],
+    "Physics": [
+        ("A {a} kg body accelerates at {b} m/s². What net force acts on it in newtons?", "{p1}", "F = ma."),
+        ("A car covers {b} m in {c} s at constant speed. What is its speed in m/s (2 d.p.)?", "{p2}", "v = d / t."),
+        ("What is the kinetic energy in joules of a {a} kg mass moving at {c} m/s?", "{p3}", "KE = ½mv².")
+    ],
+    "Chemistry": [
+        ("How many grams are in {a} moles of a compound with molar mass {b} g/mol?", "{c1}", "mass = n × M."),
+        ("A solution contains {a} mol of solute in {c} L. What is its molarity (2 d.p.)?", "{c2}", "M = n / V.")
+    ]
+}
+GENERIC_MCQ_TEMPLATES = [
+    ("Which statement about {topic} is supported by case {a} of {b} in the textbook?",
+     "It follows from the definition of {topic}", "Recall the chapter summary."),
+    ("In exercise {a}.{c} on {topic}, which option best explains observation {b}?",
+     "The effect described in section {a}", "Apply the definition.")
+]
+GENERIC_DISTRACTORS = [
+    "It only holds for the special case in example {b}",
+    "It contradicts the result of exercise {a}",
+    "It cannot be determined from the given data"
+]
+
+SHORT_TEMPLATES = [
+    "Explain, with an example from exercise {a}, one key idea of {topic}.",
+    "Describe how {topic} applies to the situation in problem {a}.{c} and justify your answer.",
+    "Compare two approaches to question {b} on {topic} and state which is more efficient."
+]
+
+def parse_latency(spec):
+    """Turn a latency spec into a function returning seconds
+
+    Specs: "0", "fixed:0.5", "uniform:0.2,1.5", "lognormal:median,sigma",
+    "exponential:mean".
+    """
+    spec = str(spec).strip()
+    if ":" not in spec:
+        value = float(spec)
+        return lambda rng: value
+
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / values[0])
+    raise ValueError(f"Unknown latency distribution: {kind}")
+
+class ServerConfig:
+    """Fault and timing settings shared by all request handlers"""
+
+    def __init__(self, latency="0", tokens_per_second=0, rate_429=0.0, rate_529=0.0, rate_5xx=0.0,
+                 rate_truncated=0.0, rate_malformed=0.0, retry_after=1, rate_stall=0.0, stall_seconds=20,
+                 seed=None):
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_529 = rate_529
+        self.rate_5xx = rate_5xx
+        self.rate_truncated = rate_truncated
+        self.rate_malformed = rate_malformed
+        self.retry_after = retry_after
+        self.rate_stall = rate_stall
+        self.stall_seconds = stall_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {}
+        self._seen_system_prompts = set()
+
+    def random(self):
+        with self._lock:
+            return self._rng.random()
+
+    def rng(self):
+        """A private generator for one request, seeded from the shared one"""
+        with self._lock:
+            return random.Random(self._rng.getrandbits(64))
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def cache_hit(self, system_text):
+        """Whether a system prompt was seen before, like Anthropic's prompt cache"""
+        with self._lock:
+            hit = system_text in self._seen_system_prompts
+            self._seen_system_prompts.add(system_text)
+            return hit
+
+def _fill(template, topic, rng):
+    a, b, c = rng.randint(2, 60), rng.randint(3, 400), rng.randint(2, 90)
+    values = {
+        "a": a, "b": b, "c": c, "bc": b + c, "topic": topic,
+        "d1": b * b - 4 * a * c, "d2": b * b - 2 * c, "d3": b + (a - 1) * c, "d4": a * (a + 1) // 2 * c,
+        "p1": a * b, "p2": f"{b / c:.2f}", "p3": f"{0.5 * a * c * c:g}",
+        "c1": a * b, "c2": f"{a / c:.2f}"
+    }
+    return {key: template_part.format(**values) for key, template_part in template.items()}
+
+def make_questions(subject, topic, mcq_count, short_count, first_number, rng):
+    """Canned exam questions with distinct numbers, in the app's JSON shape"""
+    templates = MCQ_TEMPLATES.get(subject, GENERIC_MCQ_TEMPLATES)
+    questions = []
+
+    for _ in range(mcq_count):
+        question, answer, explanation = rng.choice(templates)
+        filled = _fill({"question": question, "answer": answer, "explanation": explanation}, topic, rng)
+        correct = rng.choice("ABCD")
+        distractors = iter(_distractors(filled["answer"], topic, rng))
+        options = {
+            letter: filled["answer"] if letter == correct else next(distractors)
+            for letter in "ABCD"
+        }
+        questions.append({
+            "question_number": first_number + len(questions),
+            "type": "mcq",
+            "question": filled["question"],
+            "options": options,
+            "correct_answer": correct,
+            "explanation": filled["explanation"]
+        })
+
+    for _ in range(short_count):
+        filled = _fill({"question": rng.choice(SHORT_TEMPLATES)}, topic, rng)
+        questions.append({
+            "question_number": first_number + len(questions),
+            "type": "short_answer",
+            "question": filled["question"],
+            "sample_answer": f"A complete answer defines the idea, applies it to {topic} and checks the result.",
+            "explanation": "Marks are awarded for the definition, the application and the conclusion."
+        })
+
+    return questions
+
+def _distractors(answer, topic, rng):
+    """Three wrong options near a numeric answer, or generic ones for text answers"""
+    try:
+        value = float(answer)
+    except ValueError:
+        return [_fill({"text": text}, topic, rng)["text"] for text in GENERIC_DISTRACTORS]
+
+    step = max(abs(value) * 0.1, 1)
+    wrong = [value + offset * step for offset in rng.sample([-3, -2, -1, 1, 2, 3], 3)]
+    return [f"{option:.2f}" if "." in answer else str(int(round(option))) for option in wrong]
+
+def _prompt_text(payload):
+    parts = []
+    for message in payload.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(block.get("text", "") for block in content if isinstance(block, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+def _system_text(payload):
+    system = payload.get("system", "")
+    if isinstance(system, list):
+        return "".join(block.get("text", "") for block in system if isinstance(block, dict))
+    return str(system)
+
+def _cache_marked(payload):
+    system = payload.get("system")
+    return isinstance(system, list) and any(isinstance(block, dict) and block.get("cache_control") for block in system)
+
+def malform(text, rng):
+    """Apply the kinds of damage seen in real completions"""
+    damage = rng.choice(["prose", "fence", "trailing_commas", "smart_quotes", "raw_newline"])
+    if damage == "prose":
+        return "Here is your test paper:\n\n" + text + "\n\nLet me know if you need changes!"
+    if damage == "fence":
+        return "```json\n" + text + "\n```"
+    if damage == "trailing_commas":
+        return text.replace('"\n        }', '",\n        }')
+    if damage == "smart_quotes":
+        return text.replace('"correct_answer": ', '“correct_answer”: ')
+    return text.replace("Use ", "Use\n", 1)
+
+def build_completion(payload, config, rng):
+    """Return (completion text, stop_reason) for a Messages API request"""
+    prompt = _prompt_text(payload)
+    paper = _PAPER_RE.search(prompt)
+    if paper is None:
+        # Connection tests and anything else that is not a paper request
+        return "OK", "end_turn"
+
+    board, grade, subject, topic = paper.group(1), int(paper.group(2)), paper.group(3), paper.group(4)
+    mcq_match = _MCQ_COUNT_RE.search(prompt)
+    short_match = _SHORT_COUNT_RE.search(prompt)
+    first_match = _FIRST_NUMBER_RE.search(prompt)
+    paper_type = _PAPER_TYPE_RE.search(prompt)
+
+    mcq_count = int(mcq_match.group(1)) if mcq_match else 0
+    short_count = int(short_match.group(1)) if short_match else 0
+    questions = make_questions(subject, topic, mcq_count, short_count, int(first_match.group(1)) if first_match else 1, rng)
+
+    text = json.dumps({
+        "test_info": {
+            "board": board,
+            "grade": grade,
+            "subject": subject,
+            "topic": topic,
+            "paper_type": paper_type.group(1) if paper_type else "",
+            "total_questions": len(questions),
+            "show_answers_on_screen": False
+        },
+        "questions": questions
+    }, indent=4, ensure_ascii=False)
+
+    if config.random() < config.rate_malformed:
+        config.count("malformed")
+        text = malform(text, rng)
+
+    max_chars = int(payload.get("max_tokens", 4000)) * CHARS_PER_TOKEN
+    if len(text) > max_chars:
+        return text[:max_chars], "max_tokens"
+    if config.random() < config.rate_truncated:
+        config.count("truncated")
+        return text[:rng.randint(len(text) // 4, len(text) * 3 // 4)], "max_tokens"
+    return text, "end_turn"
+
+def build_message(payload, config, rng, text, stop_reason):
+    system_text = _system_text(payload)
+    input_tokens = len(_prompt_text(payload)) // CHARS_PER_TOKEN
+    system_tokens = len(system_text) // CHARS_PER_TOKEN
+    cacheable = _cache_marked(payload) and system_tokens >= PROMPT_CACHE_MIN_TOKENS
+    cached = cacheable and config.cache_hit(system_text)
+    if not cacheable:
+        # An uncached system prompt is billed as ordinary input
+        input_tokens += system_tokens
+        system_tokens = 0
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": payload.get("model", ""),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": max(len(text) // CHARS_PER_TOKEN, 1),
+            "cache_creation_input_tokens": 0 if cached else system_tokens,
+            "cache_read_input_tokens": system_tokens if cached else 0
+        }
+    }
+
+class BatchStore:
+    """In-memory Message Batches processed on a background thread"""
+
+    def __init__(self, config):
+        self.config = config
+        self._batches = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def create(self, requests_list, base_url):
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "in_progress",
+            "request_counts": {"processing": len(requests_list), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "results_url": None
+        }
+        with self._lock:
+            self._batches[batch_id] = batch
+        threading.Thread(target=self._process, args=(batch_id, requests_list, base_url), daemon=True).start()
+        return dict(batch)
+
+    def _process(self, batch_id, requests_list, base_url):
+        lines = []
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for item in requests_list:
+            rng = self.config.rng()
+            if self.config.random() < self.config.rate_5xx:
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "api_error", "message": "Injected batch error"}}}
+                counts["errored"] += 1
+            else:
+                text, stop_reason = build_completion(item.get("params", {}), self.config, rng)
+                result = {"type": "succeeded", "message": build_message(item.get("params", {}), self.config, rng, text, stop_reason)}
+                counts["succeeded"] += 1
+            lines.append(json.dumps({"custom_id": item.get("custom_id"), "result": result}, ensure_ascii=False))
+
+        with self._lock:
+            self._results[batch_id] = ("\n".join(lines) + "\n").encode("utf-8")
+            self._batches[batch_id].update(
+                processing_status="ended",
+                request_counts=counts,
+                results_url=f"{base_url}/v1/messages/batches/{batch_id}/results"
+            )
+
+    def get(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return dict(batch) if batch else None
+
+    def results(self, batch_id):
+        with self._lock:
+            return self._results.get(batch_id)
+
+class MockClaudeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockClaude/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def handle(self):
+        # Clients may drop keep-alive connections at any time, e.g. a cancelled hedge
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, error_type, message, headers=None):
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+
+    def _authorized(self):
+        if self.headers.get("x-api-key"):
+            return True
+        self._send_error(401, "authentication_error", "invalid x-api-key")
+        return False
+
+    def _base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{self.headers.get('Host') or f'{host}:{port}'}"
+
+    def do_GET(self):
+        config = self.server.config
+        if self.path == "/stats":
+            self._send_json(200, dict(config.stats))
+            return
+        if not self._authorized():
+            return
+
+        match = re.fullmatch(r"/v1/messages/batches/([\w-]+)(/results)?", self.path)
+        if match is None:
+            self._send_error(404, "not_found_error", f"Unknown path {self.path}")
+            return
+
+        batch = self.server.batches.get(match.group(1))
+        if batch is None:
+            self._send_error(404, "not_found_error", "Batch not found")
+        elif match.group(2):
+            results = self.server.batches.results(match.group(1))
+            if results is None:
+                self._send_error(409, "invalid_request_error", "Batch is still processing")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/binary")
+            self.send_header("Content-Length", str(len(results)))
+            self.end_headers()
+            self.wfile.write(results)
+        else:
+            self._send_json(200, batch)
+
+    def do_POST(self):
+        config = self.server.config
+        payload = self._read_json()
+        if not self._authorized():
+            return
+        if payload is None:
+            self._send_error(400, "invalid_request_error", "Request body is not valid JSON")
+            return
+
+        if self.path == "/v1/messages/batches":
+            config.count("batches")
+            self._send_json(200, self.server.batches.create(payload.get("requests", []), self._base_url()))
+            return
+        if self.path != "/v1/messages":
+            self._send_error(404, "not_found_error", f"Unknown path {self.path}")
+            return
+
+        config.count("requests")
+        rng = config.rng()
+        time.sleep(max(config.latency(rng), 0))
+
+        # A stalled upstream call: nothing is sent until stall_seconds have passed
+        if config.rate_stall and config.random() < config.rate_stall:
+            config.count("stalls")
+            time.sleep(config.stall_seconds)
+
+        # Injected failures, checked in order of how often the real API returns them
+        roll = config.random()
+        if roll < config.rate_429:
+            config.count("429")
+            self._send_error(429, "rate_limit_error", "Injected rate limit", {"retry-after": str(config.retry_after)})
+            return
+        roll -= config.rate_429
+        if roll < config.rate_529:
+            config.count("529")
+            self._send_error(529, "overloaded_error", "Injected overload")
+            return
+        roll -= config.rate_529
+        if roll < config.rate_5xx:
+            status = rng.choice([500, 502, 503])
+            config.count(str(status))
+            self._send_error(status, "api_error", "Injected server error")
+            return
+
+        text, stop_reason = build_completion(payload, config, rng)
+        message = build_message(payload, config, rng, text, stop_reason)
+
+        try:
+            if payload.get("stream"):
+                config.count("streams")
+                self._stream_message(message)
+            else:
+                self._sleep_for_tokens(message["usage"]["output_tokens"])
+                self._send_json(200, message)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up, e.g. a hedged request that lost the race
+            config.count("cancelled")
+            self.close_connection = True
+
+    def _sleep_for_tokens(self, tokens):
+        if self.server.config.tokens_per_second:
+            time.sleep(tokens / self.server.config.tokens_per_second)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_event(self, event_type, data):
+        self._write_chunk(f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _stream_message(self, message):
+        """Send a message as Messages API server-sent events at the configured token rate"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        text = message["content"][0]["text"]
+        usage = message["usage"]
+        start = dict(message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))
+        self._send_event("message_start", {"type": "message_start", "message": start})
+        self._send_event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        self._send_event("ping", {"type": "ping"})
+
+        chunk_size = STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+        for offset in range(0, len(text), chunk_size):
+            self._sleep_for_tokens(STREAM_CHUNK_TOKENS)
+            self._send_event("content_block_delta", {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": text[offset:offset + chunk_size]}
+            })
+
+        self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._send_event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": usage["output_tokens"]}
+        })
+        self._send_event("message_stop", {"type": "message_stop"})
+        self._write_chunk(b"")
+
+def start_server(config, host="127.0.0.1", port=DEFAULT_PORT, verbose=False):
+    """Start the stand-in on a background thread; port 0 picks a free port
+
+    Returns the server; its Messages URL is
+    f"http://{host}:{server.server_address[1]}/v1/messages".
+    """
+    server = ThreadingHTTPServer((host, port), MockClaudeHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.batches = BatchStore(config)
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def add_server_arguments(parser):
+    """Add the fault and timing options, shared with load_driver.py"""
+    parser.add_argument("--latency", default="0", help="Time to first byte: seconds or fixed:/uniform:/lognormal:/exponential: spec")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Output token rate (0 = instant)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-529", type=float, default=0.0, help="Fraction of requests answered with 529")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of requests answered with 500/502/503")
+    parser.add_argument("--rate-truncated", type=float, default=0.0, help="Fraction of completions cut off at max_tokens")
+    parser.add_argument("--rate-malformed", type=float, default=0.0, help="Fraction of completions with damaged JSON")
+    parser.add_argument("--retry-after", type=float, default=1, help="retry-after seconds sent with 429s")
+    parser.add_argument("--rate-stall", type=float, default=0.0, help="Fraction of requests that stall before the first byte")
+    parser.add_argument("--stall-seconds", type=float, default=20, help="How long a stalled request waits")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+
+def config_from_args(args):
+    return ServerConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        rate_429=args.rate_429,
+        rate_529=args.rate_529,
+        rate_5xx=args.rate_5xx,
+        rate_truncated=args.rate_truncated,
+        rate_malformed=args.rate_malformed,
+        retry_after=args.retry_after,
+        rate_stall=args.rate_stall,
+        stall_seconds=args.stall_seconds,
+        seed=args.seed
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Claude Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = start_server(config_from_args(args), args.host, args.port, args.verbose)
+    print(f"🧪 Mock Claude API on http://{args.host}:{server.server_address[1]}/v1/messages (Ctrl+C to stop)", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import streamlit as st
 
+from attempt_mode import display_attempt_results
+
 def show_mock_test_generator():
     st.markdown("""
     <style>
@@ -48,12 +50,22 @@ def show_mock_test_generator():
         st.markdown("### 🎯 Test Generation Complete!")
         st.info("This page shows the generated test results and analytics.")
         st.markdown("**Features coming soon:**")
-        st.markdown("- Test performance analytics")
         st.markdown("- Student progress tracking")
         st.markdown("- Detailed score reports")
-        st.markdown("- Question-wise analysis")
         st.markdown('</div>', unsafe_allow_html=True)
         
+        # Analytics of the latest attempt made in attempt mode
+        last_attempt = st.session_state.get('last_attempt')
+        if last_attempt:
+            test_info = last_attempt.get('test_info', {})
+            st.caption(
+                f"Latest attempt: {test_info.get('subject', 'Subject')} - {test_info.get('topic', 'Topic')} "
+                f"(Grade {test_info.get('grade', 'N/A')}, {test_info.get('board', 'N/A')})"
+            )
+            display_attempt_results(last_attempt)
+        else:
+            st.info("✍️ Attempt a generated test to see its performance and question-wise analysis here.")
+        
         # Back button
         if st.button("← Back to Dashboard"):
             st.session_state.current_page = 'dashboard'
@@ -0,0 +1,219 @@
+import re
+import zlib
+import os
+from array import array
+
+# Near-duplicate Configuration
+SHINGLE_SIZE = 4
+NUM_BINS = 32  # MinHash values per signature
+LSH_BANDS = 8  # NUM_BINS / LSH_BANDS values per band; candidate threshold ~ (1/8) ** (1/4) = 0.59
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", 0.8))
+
+# Words that differ between phrasings of the same question ("What is" / "Find")
+_STOPWORDS = frozenset("""
+    a an the of is are was were be what which whose who find calculate compute determine
+    evaluate state give write following given value values if then in on for to by from
+    with and or its it this that these those
+""".split())
+
+# Words that turn a question into its opposite ("is NOT a factor" / "is a factor")
+_NEGATIONS = frozenset("not no never none except incorrect false cannot neither nor untrue".split())
+
+_TOKEN_RE = re.compile(r"[^\W_]+|[^\w\s]")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+_EMPTY_BIN = 0xFFFFFFFF
+_HASH_MULTIPLIER = 0x9E3779B1  # spreads crc32's low-bit structure into the top bits
+_BIN_SHIFT = 32 - (NUM_BINS - 1).bit_length()
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+
+def signature_text(question):
+    """Text a question is compared on: its stem, then its options in a fixed order
+
+    question is a question dict or just its text. Options are sorted so a
+    repeat with shuffled options still matches.
+    """
+    if not isinstance(question, dict):
+        return str(question)
+    parts = [str(question.get('question', ''))]
+    options = question.get('options')
+    if isinstance(options, dict):
+        parts.extend(sorted(str(option) for option in options.values()))
+    return " | ".join(parts)
+
+def answer_text(question):
+    """Text of an MCQ's correct option, or "" when there is none"""
+    if not isinstance(question, dict) or not isinstance(question.get('options'), dict):
+        return ""
+    return str(question['options'].get(question.get('correct_answer'), "")).strip().lower()
+
+def shingle_text(text):
+    """Character shingles of a question with case, punctuation spacing and filler words removed"""
+    tokens = [token for token in _TOKEN_RE.findall(str(text).lower()) if token not in _STOPWORDS]
+    joined = " ".join(tokens)
+    if len(joined) <= SHINGLE_SIZE:
+        return {joined} if joined else set()
+    return {joined[i:i + SHINGLE_SIZE] for i in range(len(joined) - SHINGLE_SIZE + 1)}
+
+def exact_fingerprint(question):
+    """Hash of what two duplicates must share exactly
+
+    Questions that only differ in their numbers ("x² + 5x + 6" vs "x² + 6x + 5"),
+    in a negation ("NOT a factor of 36") or in their correct answer have very
+    similar shingles but are different questions, so a duplicate must use the
+    same numbers in order, the same negations and the same answer.
+    """
+    text = signature_text(question)
+    numbers = _NUMBER_RE.findall(text)
+    negations = [token for token in _TOKEN_RE.findall(text.lower()) if token in _NEGATIONS]
+    return zlib.crc32("\x00".join([" ".join(numbers), " ".join(negations), answer_text(question)]).encode("utf-8"))
+
+def minhash_signature(question):
+    """MinHash signature of a question (dict or text) as NUM_BINS + 1 unsigned 32-bit values
+
+    Uses one-permutation hashing: each shingle is hashed once and only kept
+    if it is the minimum of its bin, so the cost is one hash per shingle
+    instead of one per shingle and permutation. Empty bins borrow the next
+    non-empty bin to their right ("rotation" densification). The last value
+    is the exact fingerprint.
+    """
+    bins = [_EMPTY_BIN] * NUM_BINS
+    for shingle in shingle_text(signature_text(question)):
+        hashed = (zlib.crc32(shingle.encode("utf-8")) * _HASH_MULTIPLIER) & 0xFFFFFFFF
+        index = hashed >> _BIN_SHIFT
+        value = hashed & _VALUE_MASK
+        if value < bins[index]:
+            bins[index] = value
+
+    # Densify; offsetting by distance keeps borrowed values distinct from the originals
+    if _EMPTY_BIN in bins and any(value != _EMPTY_BIN for value in bins):
+        filled = list(bins)
+        for index in range(NUM_BINS):
+            if bins[index] != _EMPTY_BIN:
+                continue
+            distance = 1
+            while bins[(index + distance) % NUM_BINS] == _EMPTY_BIN:
+                distance += 1
+            filled[index] = (bins[(index + distance) % NUM_BINS] + distance * (_VALUE_MASK + 1)) & 0xFFFFFFFF
+        bins = filled
+
+    bins.append(exact_fingerprint(question))
+    return array("I", bins)
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures, 0 if their exact fingerprints differ"""
+    if signature_a[NUM_BINS] != signature_b[NUM_BINS]:
+        return 0.0
+    matches = sum(1 for a, b in zip(signature_a[:NUM_BINS], signature_b[:NUM_BINS]) if a == b)
+    return matches / NUM_BINS
+
+class NearDuplicateIndex:
+    """LSH index over MinHash signatures for finding near-duplicate questions
+
+    Signatures are split into LSH_BANDS bands; two questions become
+    candidates when any band matches exactly, and candidates are confirmed
+    by their estimated similarity. Queries only look at the questions in
+    matching buckets, so their cost does not grow with the index size.
+    Entries can be scoped (e.g. by board, grade and subject) so questions
+    only match within the same scope.
+    """
+
+    def __init__(self, threshold=None, bands=LSH_BANDS):
+        if NUM_BINS % bands:
+            raise ValueError(f"bands must divide {NUM_BINS}")
+        self.threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+        self.bands = bands
+        self.rows = NUM_BINS // bands
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = array("I")  # flat, NUM_BINS + 1 values per entry
+        self._keys = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _band_hashes(self, signature, scope):
+        # Duplicates must share their exact fingerprint, so it is part of every
+        # bucket key; otherwise a template reused with new numbers fills one bucket
+        scope_hash = hash((scope, signature[NUM_BINS]))
+        rows = self.rows
+        return [
+            hash((scope_hash, signature[band * rows:(band + 1) * rows].tobytes()))
+            for band in range(self.bands)
+        ]
+
+    def _signature_at(self, entry):
+        width = NUM_BINS + 1
+        return self._signatures[entry * width:(entry + 1) * width]
+
+    def add(self, key, text=None, signature=None, scope=None):
+        """Index a question by its dict or text (or precomputed signature)"""
+        if signature is None:
+            signature = minhash_signature(text)
+        entry = len(self._keys)
+        self._keys.append(key)
+        self._signatures.extend(signature)
+
+        for buckets, band_hash in zip(self._buckets, self._band_hashes(signature, scope)):
+            bucket = buckets.get(band_hash)
+            # Most buckets hold a single entry, which is stored without a list
+            if bucket is None:
+                buckets[band_hash] = entry
+            elif isinstance(bucket, list):
+                bucket.append(entry)
+            else:
+                buckets[band_hash] = [bucket, entry]
+        return signature
+
+    def query(self, text=None, signature=None, scope=None):
+        """Return [(key, similarity)] of indexed near-duplicates, most similar first"""
+        if signature is None:
+            signature = minhash_signature(text)
+
+        candidates = set()
+        for buckets, band_hash in zip(self._buckets, self._band_hashes(signature, scope)):
+            bucket = buckets.get(band_hash)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                candidates.update(bucket)
+            else:
+                candidates.add(bucket)
+
+        matches = []
+        for entry in candidates:
+            similarity = estimate_similarity(signature, self._signature_at(entry))
+            if similarity >= self.threshold:
+                matches.append((self._keys[entry], similarity))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def add_if_new(self, key, text, scope=None):
+        """Index a question unless it duplicates one already indexed
+
+        Returns the key of the existing duplicate, or None if the question was added.
+        """
+        signature = minhash_signature(text)
+        matches = self.query(signature=signature, scope=scope)
+        if matches:
+            return matches[0][0]
+        self.add(key, signature=signature, scope=scope)
+        return None
+
+def drop_near_duplicates(questions, threshold=None):
+    """Split questions into (unique, duplicates), keeping the first of each near-duplicate group
+
+    A paper is small enough to compare every pair of signatures, which also
+    catches the pairs LSH banding would miss near the threshold.
+    """
+    threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+    unique = []
+    duplicates = []
+    kept_signatures = []
+    for question in questions:
+        signature = minhash_signature(question)
+        if any(estimate_similarity(signature, kept) >= threshold for kept in kept_signatures):
+            duplicates.append(question)
+        else:
+            unique.append(question)
+            kept_signatures.append(signature)
+    return unique, duplicates
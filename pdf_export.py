@@ -0,0 +1,153 @@
+# PDF generation needs reportlab
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+def build_questions_pdf(test_data, filename="questions.pdf"):
+    """Create PDF with questions only
+    
+    filename may also be a file-like object such as io.BytesIO.
+    """
+    if not PDF_AVAILABLE:
+        raise RuntimeError("PDF generation not available. Please install reportlab: pip install reportlab")
+    
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+    
+    # II Tuition Title style
+    tuitions_title_style = ParagraphStyle(
+        'TuitionsTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        spaceAfter=10,
+        alignment=1,  # Center
+        textColor=colors.darkblue
+    )
+    
+    # Subject title style
+    subject_title_style = ParagraphStyle(
+        'SubjectTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=20,
+        alignment=1,  # Center
+        textColor=colors.darkblue
+    )
+    
+    # Question style
+    question_style = ParagraphStyle(
+        'QuestionStyle',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceAfter=10,
+        leftIndent=20
+    )
+    
+    test_info = test_data.get('test_info', {})
+    questions = test_data.get('questions', [])
+    
+    # II Tuition Header
+    story.append(Paragraph("🎓 II Tuition Mock Test Generated", tuitions_title_style))
+    story.append(Paragraph(f"{test_info.get('subject', 'Subject')} Mock Test", subject_title_style))
+    story.append(Paragraph(f"Board: {test_info.get('board', 'N/A')} | Grade: {test_info.get('grade', 'N/A')} | Topic: {test_info.get('topic', 'N/A')}", styles['Normal']))
+    story.append(Paragraph(f"Paper Type: {test_info.get('paper_type', 'N/A')} | Total Questions: {test_info.get('total_questions', len(questions))}", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Instructions
+    story.append(Paragraph("Instructions:", styles['Heading2']))
+    story.append(Paragraph("• Read all questions carefully", styles['Normal']))
+    story.append(Paragraph("• Choose the best answer for multiple choice questions", styles['Normal']))
+    story.append(Paragraph("• Write clearly for descriptive answers", styles['Normal']))
+    story.append(Paragraph("• Manage your time effectively", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Questions
+    for i, question in enumerate(questions, 1):
+        story.append(Paragraph(f"<b>Question {i}:</b> {question.get('question', '')}", question_style))
+        
+        if question.get('type') == 'mcq' and 'options' in question:
+            options = question['options']
+            for option_key, option_text in options.items():
+                story.append(Paragraph(f"&nbsp;&nbsp;&nbsp;&nbsp;<b>{option_key})</b> {option_text}", styles['Normal']))
+        
+        story.append(Spacer(1, 15))
+    
+    doc.build(story)
+    return filename
+
+def build_answers_pdf(test_data, filename="answers.pdf"):
+    """Create PDF with answers only
+    
+    filename may also be a file-like object such as io.BytesIO.
+    """
+    if not PDF_AVAILABLE:
+        raise RuntimeError("PDF generation not available. Please install reportlab: pip install reportlab")
+    
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+    
+    # II Tuition Title style
+    tuitions_title_style = ParagraphStyle(
+        'TuitionsTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        spaceAfter=10,
+        alignment=1,  # Center
+        textColor=colors.darkgreen
+    )
+    
+    # Subject title style
+    subject_title_style = ParagraphStyle(
+        'SubjectTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=20,
+        alignment=1,  # Center
+        textColor=colors.darkgreen
+    )
+    
+    test_info = test_data.get('test_info', {})
+    questions = test_data.get('questions', [])
+    
+    # II Tuition Header
+    story.append(Paragraph("🎓 II Tuition Mock Test Generated", tuitions_title_style))
+    story.append(Paragraph(f"{test_info.get('subject', 'Subject')} Mock Test - Answer Key", subject_title_style))
+    story.append(Paragraph(f"Board: {test_info.get('board', 'N/A')} | Grade: {test_info.get('grade', 'N/A')} | Topic: {test_info.get('topic', 'N/A')}", styles['Normal']))
+    story.append(Paragraph(f"Paper Type: {test_info.get('paper_type', 'N/A')} | Total Questions: {test_info.get('total_questions', len(questions))}", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Answers
+    for i, question in enumerate(questions, 1):
+        story.append(Paragraph(f"<b>Question {i}:</b> {question.get('question', '')}", styles['Normal']))
+        
+        # Show the question options first (for MCQs)
+        if question.get('type') == 'mcq' and 'options' in question:
+            options = question['options']
+            for option_key, option_text in options.items():
+                story.append(Paragraph(f"&nbsp;&nbsp;&nbsp;&nbsp;<b>{option_key})</b> {option_text}", styles['Normal']))
+        
+        # Show the correct answer
+        if 'correct_answer' in question and question['correct_answer']:
+            story.append(Paragraph(f"<b>Correct Answer:</b> {question['correct_answer']}", styles['Normal']))
+        elif 'sample_answer' in question and question['sample_answer']:
+            story.append(Paragraph(f"<b>Sample Answer:</b> {question['sample_answer']}", styles['Normal']))
+        elif 'answer' in question and question['answer']:
+            story.append(Paragraph(f"<b>Answer:</b> {question['answer']}", styles['Normal']))
+        else:
+            story.append(Paragraph("<b>Answer:</b> Answer not generated (test created without answers)", styles['Normal']))
+        
+        # Show explanation if available
+        if 'explanation' in question and question['explanation']:
+            story.append(Paragraph(f"<b>Explanation:</b> {question['explanation']}", styles['Normal']))
+        
+        story.append(Spacer(1, 15))
+    
+    doc.build(story)
+    return filename
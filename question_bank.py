@@ -0,0 +1,358 @@
+import sqlite3
+import json
+import hashlib
+import threading
+import time
+import os
+
+from response_cache import normalize_text
+from near_duplicates import NearDuplicateIndex, signature_text, answer_text
+
+# Question Bank Configuration
+QUESTION_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "question_bank.db")
+)
+# Generated papers kept per topic for the "served from library" fallback
+PAPER_LIBRARY_PER_TOPIC = int(os.getenv("PAPER_LIBRARY_PER_TOPIC", 5))
+
+_local = threading.local()
+
+# Set once the first connection has checked whether SQLite was built with FTS5
+FTS5_AVAILABLE = None
+
+# Near-duplicate index over every banked question, built on first use
+_duplicate_index = None
+_duplicate_index_lock = threading.Lock()
+
+def question_type(question):
+    """Bank type of a question: short_answer or mcq (anything else is shown as an MCQ)"""
+    return "short_answer" if question.get("type") == "short_answer" else "mcq"
+
+def make_question_key(board, grade, subject, topic, question):
+    """Hash a question's normalized text, options and answer within its topic so repeats are stored once"""
+    key_parts = [
+        normalize_text(board),
+        int(grade),
+        normalize_text(subject),
+        normalize_text(topic),
+        normalize_text(signature_text(question)),
+        answer_text(question)
+    ]
+    payload = json.dumps(key_parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _create_fts(conn):
+    """Create the FTS5 index over question text, returning False if FTS5 is missing"""
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts
+            USING fts5(question, content='questions', content_rowid='id')
+        """)
+    except sqlite3.OperationalError:
+        return False
+
+    # External-content FTS tables are kept in sync by triggers
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+            INSERT INTO questions_fts(rowid, question) VALUES (new.id, new.question);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+            INSERT INTO questions_fts(questions_fts, rowid, question) VALUES ('delete', old.id, old.question);
+        END
+    """)
+    return True
+
+def _get_connection():
+    """Get a per-thread SQLite connection to the on-disk question bank"""
+    global FTS5_AVAILABLE
+
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == QUESTION_BANK_PATH:
+        return conn
+
+    bank_dir = os.path.dirname(QUESTION_BANK_PATH)
+    if bank_dir:
+        os.makedirs(bank_dir, exist_ok=True)
+
+    conn = sqlite3.connect(QUESTION_BANK_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            question_key TEXT NOT NULL UNIQUE,
+            board TEXT NOT NULL,
+            grade INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            type TEXT NOT NULL,
+            question TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            times_used INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Paper assembly filters on all five columns and prefers the least used questions
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_questions_paper
+        ON questions(board, grade, subject, topic, type, times_used)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_subject ON questions(board, grade, subject)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS papers (
+            id INTEGER PRIMARY KEY,
+            board TEXT NOT NULL,
+            grade INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            paper_type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_topic ON papers(board, grade, subject, topic, created_at)")
+    FTS5_AVAILABLE = _create_fts(conn)
+
+    _local.conn = conn
+    _local.path = QUESTION_BANK_PATH
+    return conn
+
+def _subject_scope(board, grade, subject):
+    return (normalize_text(board), int(grade), normalize_text(subject))
+
+def _get_duplicate_index(conn):
+    """Near-duplicate index of the bank, loaded from it once per process
+
+    Questions banked by other processes after the load are not in this
+    process's index; their exact repeats are still rejected by question_key.
+    """
+    global _duplicate_index
+
+    if _duplicate_index is None:
+        index = NearDuplicateIndex()
+        for row_id, board, grade, subject, payload in conn.execute(
+            "SELECT id, board, grade, subject, payload FROM questions"
+        ):
+            index.add(row_id, json.loads(payload), scope=(board, grade, subject))
+        _duplicate_index = index
+    return _duplicate_index
+
+def find_similar_questions(board, grade, subject, question):
+    """Return [(question id, similarity)] of banked near-duplicates of a question (dict or text) in the same subject"""
+    try:
+        conn = _get_connection()
+        with _duplicate_index_lock:
+            return _get_duplicate_index(conn).query(question, scope=_subject_scope(board, grade, subject))
+    except sqlite3.Error:
+        return []
+
+def store_questions(board, grade, subject, topic, questions):
+    """Add questions to the bank, skipping exact repeats and near-duplicates of banked questions
+
+    Returns how many questions were new.
+    """
+    global _duplicate_index
+
+    try:
+        conn = _get_connection()
+    except sqlite3.Error:
+        return 0
+
+    scope = _subject_scope(board, grade, subject)
+    now = time.time()
+    rows = []
+    for question in questions:
+        if not question.get("question"):
+            continue
+        question = {key: value for key, value in question.items() if key != "question_number"}
+        rows.append((question, (
+            make_question_key(board, grade, subject, topic, question),
+            normalize_text(board),
+            int(grade),
+            normalize_text(subject),
+            normalize_text(topic),
+            question_type(question),
+            question["question"],
+            json.dumps(question, ensure_ascii=False),
+            now
+        )))
+
+    try:
+        with _duplicate_index_lock:
+            index = _get_duplicate_index(conn)
+            inserted = 0
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for question, row in rows:
+                    if index.query(question, scope=scope):
+                        continue
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO questions "
+                        "(question_key, board, grade, subject, topic, type, question, payload, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row
+                    )
+                    if cursor.rowcount:
+                        inserted += 1
+                        index.add(cursor.lastrowid, question, scope=scope)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                # The index may now hold rows that were rolled back
+                _duplicate_index = None
+                raise
+        return inserted
+
+    except (sqlite3.Error, TypeError, ValueError):
+        # A broken bank must never block generation
+        return 0
+
+def select_questions(board, grade, subject, topic, mcq_count, short_count):
+    """Pick up to mcq_count MCQs and short_count short answer questions for a topic
+
+    The least used questions are picked first (ties in random order) and
+    their use count is bumped, so successive papers rotate through the bank.
+    Returns (mcqs, short answer questions).
+    """
+    key = (normalize_text(board), int(grade), normalize_text(subject), normalize_text(topic))
+    selected = {"mcq": [], "short_answer": []}
+
+    try:
+        conn = _get_connection()
+        for bank_type, count in (("mcq", mcq_count), ("short_answer", short_count)):
+            if count <= 0:
+                continue
+            rows = conn.execute(
+                "SELECT id, payload FROM questions "
+                "WHERE board = ? AND grade = ? AND subject = ? AND topic = ? AND type = ? "
+                "ORDER BY times_used, random() LIMIT ?",
+                key + (bank_type, count)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE questions SET times_used = times_used + 1 WHERE id = ?",
+                    [(row_id,) for row_id, _ in rows]
+                )
+            selected[bank_type] = [json.loads(payload) for _, payload in rows]
+
+    except (sqlite3.Error, ValueError):
+        return [], []
+
+    return selected["mcq"], selected["short_answer"]
+
+def count_questions(board, grade, subject, topic=None):
+    """Count banked questions by type for a subject, or one topic of it"""
+    query = "SELECT type, COUNT(*) FROM questions WHERE board = ? AND grade = ? AND subject = ?"
+    params = [normalize_text(board), int(grade), normalize_text(subject)]
+    if topic is not None:
+        query += " AND topic = ?"
+        params.append(normalize_text(topic))
+
+    counts = {"mcq": 0, "short_answer": 0}
+    try:
+        for bank_type, count in _get_connection().execute(query + " GROUP BY type", params):
+            counts[bank_type] = count
+    except sqlite3.Error:
+        pass
+    return counts
+
+def search_questions(text, board=None, grade=None, subject=None, limit=20):
+    """Full-text search of banked question text, best matches first
+
+    Uses the FTS5 index when SQLite has it and a LIKE scan otherwise.
+    """
+    words = [word for word in normalize_text(text).replace('"', " ").split() if word]
+    if not words:
+        return []
+
+    filters = []
+    params = []
+    for column, value in (("board", board), ("grade", grade), ("subject", subject)):
+        if value is not None:
+            filters.append(f"q.{column} = ?")
+            params.append(int(value) if column == "grade" else normalize_text(value))
+
+    try:
+        conn = _get_connection()
+        if FTS5_AVAILABLE:
+            # Quote each word so user input cannot inject FTS query syntax
+            match = " ".join(f'"{word}"' for word in words)
+            query = (
+                "SELECT q.payload, q.topic FROM questions_fts f JOIN questions q ON q.id = f.rowid "
+                "WHERE questions_fts MATCH ?"
+            )
+            params.insert(0, match)
+            order = " ORDER BY f.rank LIMIT ?"
+        else:
+            query = "SELECT q.payload, q.topic FROM questions q WHERE " + " AND ".join(
+                "lower(q.question) LIKE ?" for _ in words
+            )
+            params[:0] = [f"%{word}%" for word in words]
+            order = " ORDER BY q.id DESC LIMIT ?"
+
+        if filters:
+            query += " AND " + " AND ".join(filters)
+        rows = conn.execute(query + order, params + [limit]).fetchall()
+        return [dict(json.loads(payload), topic=topic) for payload, topic in rows]
+
+    except (sqlite3.Error, ValueError):
+        return []
+
+def store_paper(board, grade, subject, topic, paper_type, test_data):
+    """Keep a generated paper in the library, pruning the topic to PAPER_LIBRARY_PER_TOPIC papers"""
+    key = (normalize_text(board), int(grade), normalize_text(subject), normalize_text(topic))
+    try:
+        conn = _get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO papers (board, grade, subject, topic, paper_type, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (normalize_text(paper_type), json.dumps(test_data, ensure_ascii=False), time.time())
+            )
+            conn.execute(
+                "DELETE FROM papers WHERE board = ? AND grade = ? AND subject = ? AND topic = ? AND id NOT IN ("
+                "SELECT id FROM papers WHERE board = ? AND grade = ? AND subject = ? AND topic = ? "
+                "ORDER BY created_at DESC LIMIT ?)",
+                key + key + (PAPER_LIBRARY_PER_TOPIC,)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+    except (sqlite3.Error, TypeError, ValueError):
+        return False
+
+def get_library_paper(board, grade, subject, topic, paper_type=None):
+    """Most recent stored paper for a topic, preferring the requested paper type
+
+    Returns (test data, created_at) or (None, None).
+    """
+    key = (normalize_text(board), int(grade), normalize_text(subject), normalize_text(topic))
+    try:
+        row = _get_connection().execute(
+            "SELECT payload, created_at FROM papers "
+            "WHERE board = ? AND grade = ? AND subject = ? AND topic = ? "
+            "ORDER BY paper_type = ? DESC, created_at DESC LIMIT 1",
+            key + (normalize_text(paper_type or ""),)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+    except (sqlite3.Error, ValueError):
+        return None, None
+
+def get_bank_stats():
+    """Get question count by type for the whole bank"""
+    try:
+        rows = _get_connection().execute("SELECT type, COUNT(*) FROM questions GROUP BY type").fetchall()
+        stats = {"mcq": 0, "short_answer": 0}
+        stats.update(rows)
+        stats["total"] = stats["mcq"] + stats["short_answer"]
+        return stats
+    except sqlite3.Error:
+        return {"mcq": 0, "short_answer": 0, "total": 0}
@@ -0,0 +1,702 @@
+import os
+import queue
+import time
+import uuid
+import contextvars
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from response_cache import normalize_text, store_response
+from question_bank import store_questions, select_questions, store_paper
+from near_duplicates import drop_near_duplicates
+from question_stream import iter_message_stream, IncrementalQuestionParser, salvage_questions
+from claude_client import get_claude_client, RETRY_STATUS_CODES
+from circuit_breaker import get_circuit_breaker, CircuitOpenError, OPEN
+from json_extract import extract_json, JSONExtractionError
+from catalog import get_catalog, catalog_revision
+from curriculum_ranker import CurriculumRanker
+from keyword_index import PrefixTrie
+from topic_relevance import get_enhanced_subject_keywords
+from metrics import span, inc
+from usage_ledger import usage_context, record_call, record_paper, check_budget, get_topic_counts, DOWNGRADE_MODEL
+
+# Configuration
+CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY", "")
+CLAUDE_API_URL = os.getenv("CLAUDE_API_URL", "https://api.anthropic.com/v1/messages")
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+
+# Bump whenever the generation prompt changes so cached papers are not reused
+PROMPT_VERSION = 6
+
+# Shortest system prompt each model will cache, in tokens, and a conservative token estimate
+PROMPT_CACHE_MIN_TOKENS = {
+    "claude-3-5-haiku-20241022": 2048
+}
+DEFAULT_PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CHARS_PER_TOKEN = 4
+
+# Large papers are generated as concurrent shards of SHARD_SIZE questions
+SHARD_SIZE = int(os.getenv("GENERATION_SHARD_SIZE", 5))
+MAX_CONCURRENT_SHARDS = int(os.getenv("GENERATION_MAX_CONCURRENT_SHARDS", 4))
+
+# Typeahead weight of a curriculum chapter, as if it had been generated this many times
+CURRICULUM_TOPIC_POPULARITY = 3
+
+# Follow-up requests allowed for a shard whose completion hit max_tokens
+MAX_CONTINUATIONS = 2
+
+# Rounds of extra shards generated to replace near-duplicates dropped from a paper
+MAX_BACKFILL_ROUNDS = 2
+def get_subjects_by_board():
+    """Subjects offered by each board, by grade (read-only, from the subjects_by_board catalog)"""
+    return get_catalog("subjects_by_board").data
+
+def get_curriculum_map():
+    """Curriculum chapters by board, subject and grade (read-only, from the curriculum catalog)"""
+    return get_catalog("curriculum").data
+
+def get_curriculum_specific_content(board, grade, subject):
+    """Get curriculum-specific content mapping for realistic question generation"""
+    return get_curriculum_map().get(board, {}).get(subject, {}).get(grade, ())
+
+def get_curriculum_ranker():
+    """TF-IDF ranker over every curriculum chapter and subject keyword, rebuilt only when a catalog changes"""
+    return _build_curriculum_ranker(catalog_revision())
+
+@lru_cache(maxsize=1)
+def _build_curriculum_ranker(revision):
+    return CurriculumRanker(get_curriculum_map(), get_enhanced_subject_keywords())
+
+def get_topic_trie(board, grade, subject):
+    """Typeahead trie over the curriculum chapters, subject keywords and previously generated topics
+    
+    Built once per process for each board, grade and subject (and again when a
+    catalog changes); add() newly generated topics to keep it current.
+    """
+    return _build_topic_trie(board, grade, subject, catalog_revision())
+
+@lru_cache(maxsize=256)
+def _build_topic_trie(board, grade, subject, revision):
+    trie = PrefixTrie()
+    for chapter in get_curriculum_specific_content(board, grade, subject):
+        trie.add(chapter, CURRICULUM_TOPIC_POPULARITY)
+    for keyword in get_enhanced_subject_keywords().get(subject, []):
+        trie.add(keyword)
+    for topic, papers in get_topic_counts(board, grade, subject):
+        trie.add(topic, papers)
+    return trie
+def get_question_counts(paper_type):
+    """Get (MCQ count, short answer count) for a paper type"""
+    if paper_type == "Paper 1 (25 MCQs)":
+        return 25, 0
+    elif paper_type == "Paper 2 (23 Mixed)":
+        return 15, 8
+    elif paper_type == "Paper 4 (50 MCQs)":
+        return 50, 0
+    elif paper_type == "Paper 5 (100 MCQs)":
+        return 100, 0
+    else:  # Paper 3 (more than 25)
+        return 30, 0
+
+def plan_shards(mcq_count, short_count, shard_size=None, first_mcq_number=1, first_short_number=None):
+    """Split a paper into shards of at most shard_size questions
+    
+    Returns a list of (mcq_count, short_count, first_question_number) tuples,
+    MCQs first and short answer questions after them. Questions are numbered
+    from first_mcq_number and first_short_number, which default to a paper
+    made of these questions alone.
+    """
+    shard_size = max(int(shard_size or SHARD_SIZE), 1)
+    if first_short_number is None:
+        first_short_number = first_mcq_number + mcq_count
+    shards = []
+    
+    for question_type_count, is_mcq, next_number in ((mcq_count, True, first_mcq_number), (short_count, False, first_short_number)):
+        remaining = question_type_count
+        while remaining > 0:
+            count = min(shard_size, remaining)
+            shards.append((count, 0, next_number) if is_mcq else (0, count, next_number))
+            next_number += count
+            remaining -= count
+    
+    return shards
+
+def build_prompt_prefix(board, grade, subject):
+    """Build the stable part of the generation prompt for a board, grade and subject
+    
+    It is sent as a system block, marked for prompt caching once it is long
+    enough to be cached (see build_message_payload).
+    """
+    return _build_prompt_prefix(board, grade, subject, catalog_revision())
+
+@lru_cache(maxsize=None)
+def _build_prompt_prefix(board, grade, subject, revision):
+    curriculum_topics = get_curriculum_specific_content(board, grade, subject)
+    curriculum_context = ", ".join(curriculum_topics) if curriculum_topics else f"{subject} topics for Grade {grade}"
+    
+    return f"""You write challenging {board} Grade {grade} {subject} exam papers.
+CURRICULUM CHAPTERS: {curriculum_context}
+
+Requirements:
+- Create REAL exam questions with actual content about the requested topic
+- Make questions challenging and difficult level
+- Each MCQ has 4 options (A, B, C, D) with one correct answer
+- Use actual facts, calculations, formulas related to the topic
+- No generic descriptions - create specific questions
+- Test deep understanding of the topic's concepts
+- Make questions that would appear in competitive exams
+
+Return in JSON format:
+{{
+    "test_info": {{
+        "board": "{board}",
+        "grade": {grade},
+        "subject": "{subject}",
+        "topic": "<topic>",
+        "paper_type": "<paper type>",
+        "total_questions": <number of questions requested>,
+        "show_answers_on_screen": false
+    }},
+    "questions": [
+        {{
+            "question_number": 1,
+            "type": "mcq",
+            "question": "Real challenging question about the topic",
+            "options": {{
+                "A": "Option A",
+                "B": "Option B",
+                "C": "Option C",
+                "D": "Option D"
+            }},
+            "correct_answer": "A",
+            "explanation": "Explanation"
+        }},
+        {{
+            "question_number": 2,
+            "type": "short_answer",
+            "question": "Real challenging short answer question about the topic",
+            "sample_answer": "Model answer",
+            "explanation": "Explanation"
+        }}
+    ]
+}}"""
+
+def build_generation_prompt(board, grade, subject, topic, paper_type, mcq_count, short_count,
+                            include_answers_on_screen, shard_index=1, shard_total=1, first_number=1,
+                            avoid_questions=()):
+    """Build the variable part of the generation prompt for a paper, one shard of it, or a continuation
+    
+    The requirements and JSON format for the board, grade and subject come from build_prompt_prefix.
+    """
+    
+    # Tell each shard which part of the paper it owns so parts do not repeat each other
+    shard_note = ""
+    if shard_total > 1:
+        shard_note += f"""
+This is part {shard_index} of {shard_total} of a larger paper.
+Focus this part on a different aspect of {topic} than the other parts so no question is repeated.
+"""
+    if shard_total > 1 or first_number > 1:
+        shard_note += f"""Number the questions starting at {first_number}.
+"""
+    
+    # Continuations list what was already generated so it is not asked again
+    if avoid_questions:
+        avoid_list = "\n".join(f"- {question[:100]}" for question in avoid_questions)
+        shard_note += f"""Do not repeat any of these existing questions:
+{avoid_list}
+"""
+    
+    # Name the chapters the topic maps onto so questions stay within the syllabus
+    curriculum_context = get_curriculum_ranker().curriculum_context(topic, board, grade, subject)
+    if curriculum_context:
+        shard_note = f"""Curriculum chapters for this topic: {', '.join(curriculum_context)}
+""" + shard_note
+    
+    # Simple prompt - let Claude generate real difficult questions
+    return f"""Create a challenging {board} Grade {grade} {subject} test on "{topic}".
+{shard_note}
+Generate {mcq_count} difficult multiple choice questions about {topic}.
+Generate {short_count} challenging short answer questions about {topic}.
+
+Use topic "{topic}", paper type "{paper_type}", total_questions {mcq_count + short_count} and show_answers_on_screen {str(include_answers_on_screen).lower()} in test_info."""
+
+class GenerationError(Exception):
+    """Raised when a generation request fails, carrying the message shown to the user"""
+
+class ServiceUnavailableError(GenerationError):
+    """Raised without calling upstream while the API circuit breaker is open"""
+
+def generation_available():
+    """Whether the API circuit breaker is letting generation requests through (half-open lets probes through)"""
+    return get_circuit_breaker(CLAUDE_API_URL).state != OPEN
+
+def stream_response_text(response, on_question):
+    """Collect streamed completion text, passing each finished question to on_question
+    
+    Returns (completion text, stop_reason, usage). Lines are read as bytes and
+    decoded as UTF-8 by iter_sse_events: text/event-stream responses carry no
+    charset, so requests would otherwise decode them as ISO-8859-1.
+    """
+    parser = IncrementalQuestionParser()
+    stop_reason = None
+    usage = {}
+    
+    for item_type, value in iter_message_stream(response.iter_lines()):
+        if item_type == "text":
+            for question in parser.feed(value):
+                on_question(question)
+        elif item_type == "usage":
+            usage.update(value)
+        elif item_type == "stop":
+            stop_reason = value.get("stop_reason") or stop_reason
+            usage.update(value.get("usage") or {})
+    
+    return parser.buffer, stop_reason, usage
+
+def parse_test_response(content):
+    """Extract the test JSON from a completion
+    
+    Prose, code fences, smart quotes, trailing commas and raw newlines in
+    strings are tolerated so a recoverable reply does not cost a regeneration.
+    """
+    with span("parse", chars=len(content)):
+        try:
+            test_data, repairs = extract_json(content)
+        except JSONExtractionError:
+            inc("mocktest_parse_failures_total", reason="invalid_json")
+            raise GenerationError("❌ Could not parse AI response. Try again.")
+        
+        for repair in repairs:
+            inc("mocktest_json_repairs_total", repair=repair)
+        
+        if not isinstance(test_data, dict):
+            inc("mocktest_parse_failures_total", reason="not_an_object")
+            raise GenerationError("❌ Could not parse AI response. Try again.")
+    
+    return test_data
+
+def prompt_cacheable(system_prompt, model=None):
+    """Whether a system prompt is long enough for the model's prompt cache
+    
+    Shorter prompts are processed uncached whatever their marker says, so
+    they are sent without one.
+    """
+    min_tokens = PROMPT_CACHE_MIN_TOKENS.get(model or CLAUDE_MODEL, DEFAULT_PROMPT_CACHE_MIN_TOKENS)
+    return len(system_prompt) / PROMPT_CHARS_PER_TOKEN >= min_tokens
+
+def build_message_payload(prompt, system_prompt=None, model=None):
+    """Build the Messages API request body for one generation prompt
+    
+    system_prompt is sent as a system block, with a cache_control marker when
+    it is long enough to be served from Anthropic's prompt cache.
+    """
+    data = {
+        "model": model or CLAUDE_MODEL,
+        "max_tokens": 4000,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    
+    if system_prompt:
+        system_block = {"type": "text", "text": system_prompt}
+        if prompt_cacheable(system_prompt, data["model"]):
+            system_block["cache_control"] = {"type": "ephemeral"}
+        data["system"] = [system_block]
+    
+    return data
+
+def request_completion(prompt, on_question=None, system_prompt=None, model=None, kind="generation"):
+    """Send one generation prompt to Claude and return (completion text, stop_reason)
+    
+    Safe to call from worker threads: failures are raised as GenerationError
+    instead of being written to the page. Usage and latency of every
+    response are recorded in the usage ledger. Calls go through the API
+    circuit breaker, which fails fast with ServiceUnavailableError while open.
+    """
+    data = build_message_payload(prompt, system_prompt, model)
+    
+    if on_question:
+        data["stream"] = True
+    
+    breaker = get_circuit_breaker(CLAUDE_API_URL)
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        raise ServiceUnavailableError(
+            f"❌ The AI service is unavailable right now. Try again in {max(breaker.retry_in(), 1):.0f} seconds."
+        )
+    
+    upstream_ok = False
+    response_seconds = 0.0
+    try:
+        client = get_claude_client(CLAUDE_API_KEY, CLAUDE_API_URL)
+        started = time.perf_counter()
+        response = client.post_messages(data, stream=bool(on_question))
+        response_seconds = time.perf_counter() - started
+        upstream_ok = response.status_code not in RETRY_STATUS_CODES
+        
+        if response.status_code == 200:
+            with span("generation", stream=bool(on_question)):
+                if on_question:
+                    content, stop_reason, usage = stream_response_text(response, on_question)
+                else:
+                    result = response.json()
+                    content, stop_reason, usage = result['content'][0]['text'], result.get('stop_reason'), result.get('usage')
+            record_call(usage, data["model"], time.perf_counter() - started, kind=kind)
+            return content, stop_reason
+        
+        record_call(None, data["model"], time.perf_counter() - started, response.status_code, kind)
+        
+        if response.status_code == 401:
+            raise GenerationError("❌ API Authentication failed. Check your API key.")
+        elif response.status_code == 429:
+            raise GenerationError("❌ API rate limit exceeded. Please wait and try again.")
+        else:
+            raise GenerationError(f"❌ API Error {response.status_code}")
+    
+    except GenerationError:
+        raise
+    except Exception as e:
+        upstream_ok = False
+        raise GenerationError(f"❌ Request failed: {str(e)}")
+    finally:
+        if upstream_ok:
+            breaker.record_success(response_seconds)
+        else:
+            breaker.record_failure()
+
+def test_claude_api():
+    """Test Claude API connection
+    
+    The test goes through the API circuit breaker like any other call, so
+    after the cool-down it is the half-open probe that closes (or reopens) it.
+    """
+    try:
+        if not CLAUDE_API_KEY or CLAUDE_API_KEY == "REPLACE_WITH_YOUR_API_KEY":
+            return False, "API key not configured"
+        
+        breaker = get_circuit_breaker(CLAUDE_API_URL)
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            if breaker.state == OPEN:
+                return False, (
+                    "API temporarily unavailable after repeated failures - papers are served from the library. "
+                    f"Try again in {max(breaker.retry_in(), 1):.0f} seconds"
+                )
+            return False, "API recovery is already being checked - try again in a moment"
+        
+        data = {
+            "model": CLAUDE_MODEL,
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": "Test"}]
+        }
+        
+        upstream_ok = False
+        try:
+            client = get_claude_client(CLAUDE_API_KEY, CLAUDE_API_URL)
+            response = client.post_messages(data, read_timeout=10, max_retries=1, hedge=False)
+            upstream_ok = response.status_code not in RETRY_STATUS_CODES
+        finally:
+            if upstream_ok:
+                breaker.record_success(response.elapsed.total_seconds())
+            else:
+                breaker.record_failure()
+        
+        if response.status_code == 200:
+            record_call(response.json().get('usage'), CLAUDE_MODEL, response.elapsed.total_seconds(), kind="connection_test")
+            return True, "API connection successful"
+        elif response.status_code == 401:
+            return False, f"API Authentication failed - check your API key"
+        elif response.status_code == 429:
+            return False, f"API rate limit exceeded - try again later"
+        else:
+            try:
+                error_detail = response.json()
+                return False, f"API Error {response.status_code}: {error_detail.get('error', {}).get('message', 'Unknown error')}"
+            except:
+                return False, f"API Error: {response.status_code}"
+            
+    except Exception as e:
+        return False, f"Connection Error: {str(e)}"
+
+def generate_shard(build_prompt, mcq_count, short_count, first_number, on_question=None, system_prompt=None, model=None):
+    """Generate one shard, continuing it if the completion was cut off at max_tokens
+    
+    build_prompt(mcq_count, short_count, first_number, avoid_questions) builds the
+    prompt. A truncated completion keeps every complete question object and
+    only the missing questions are requested again.
+    """
+    with span("prompt_build"):
+        prompt = build_prompt(mcq_count, short_count, first_number, ())
+    content, stop_reason = request_completion(prompt, on_question, system_prompt, model)
+    
+    if stop_reason != "max_tokens":
+        return parse_test_response(content)
+    
+    # Salvage the complete questions from the truncated JSON
+    test_info = {}
+    questions = salvage_questions(content)
+    
+    for _ in range(MAX_CONTINUATIONS):
+        missing_mcq = mcq_count - sum(1 for question in questions if question.get('type') != 'short_answer')
+        missing_short = short_count - sum(1 for question in questions if question.get('type') == 'short_answer')
+        if missing_mcq <= 0 and missing_short <= 0:
+            break
+        
+        with span("prompt_build", continuation=True):
+            continuation_prompt = build_prompt(
+                max(missing_mcq, 0), max(missing_short, 0), first_number + len(questions),
+                [question.get('question', '') for question in questions]
+            )
+        inc("mocktest_continuations_total")
+        content, stop_reason = request_completion(continuation_prompt, on_question, system_prompt, model, "continuation")
+        
+        if stop_reason == "max_tokens":
+            new_questions = salvage_questions(content)
+        else:
+            continuation_data = parse_test_response(content)
+            test_info = continuation_data.get('test_info', test_info)
+            new_questions = continuation_data.get('questions', [])
+        
+        if not new_questions:
+            break
+        questions.extend(new_questions)
+    
+    if not questions:
+        raise GenerationError("❌ Could not parse AI response. Try again.")
+    
+    return {'test_info': test_info, 'questions': questions[:mcq_count + short_count]}
+
+def unique_questions(shard_results):
+    """Split the questions of shard results, in order, into (unique, near-duplicates); blank ones are skipped"""
+    questions = []
+    for shard_data in shard_results:
+        questions.extend(
+            question for question in (shard_data or {}).get('questions', [])
+            if normalize_text(question.get('question', ''))
+        )
+    return drop_near_duplicates(questions)
+
+def merge_shard_results(shard_results, test_info):
+    """Merge shard test data into one paper
+    
+    Drops repeated and near-duplicate questions, renumbers question_number
+    and rebuilds test_info.total_questions. The number of dropped questions
+    is reported as test_info.duplicates_removed.
+    """
+    questions, duplicates = unique_questions(shard_results)
+    for number, question in enumerate(questions, 1):
+        question['question_number'] = number
+    
+    merged_info = dict(test_info)
+    merged_info['total_questions'] = len(questions)
+    merged_info['duplicates_removed'] = len(duplicates)
+    return {'test_info': merged_info, 'questions': questions}
+
+def run_shards(shard_jobs, on_question=None, max_concurrency=None):
+    """Run shard jobs concurrently and return their test data in shard order
+    
+    Each job is called with the question callback for its shard. Questions
+    streamed by worker threads are handed to on_question from the calling
+    thread, since Streamlit elements can only be drawn from the script thread.
+    Jobs run in a copy of the caller's context so their spans reach its trace.
+    """
+    if len(shard_jobs) == 1:
+        return [shard_jobs[0](on_question)]
+    
+    max_workers = max(min(int(max_concurrency or MAX_CONCURRENT_SHARDS), len(shard_jobs)), 1)
+    question_queue = queue.Queue()
+    shard_callback = question_queue.put if on_question else None
+    results = [None] * len(shard_jobs)
+    
+    def drain_questions():
+        while on_question and not question_queue.empty():
+            on_question(question_queue.get_nowait())
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, job, shard_callback): index
+            for index, job in enumerate(shard_jobs)
+        }
+        pending = set(futures)
+        
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                drain_questions()
+                for future in done:
+                    results[futures[future]] = future.result()
+        except GenerationError:
+            # Skip shards that have not started; the paper is incomplete anyway
+            for future in pending:
+                future.cancel()
+            raise
+    
+    drain_questions()
+    return results
+
+def build_paper_prompts(board, grade, subject, topic, paper_type, include_answers_on_screen):
+    """Build (system prompt, shard prompts) for a paper without sending anything"""
+    mcq_count, short_count = get_question_counts(paper_type)
+    shards = plan_shards(mcq_count, short_count)
+    
+    prompts = [
+        build_generation_prompt(
+            board, grade, subject, topic, paper_type, shard_mcq, shard_short,
+            include_answers_on_screen, index, len(shards), first_number
+        )
+        for index, (shard_mcq, shard_short, first_number) in enumerate(shards, 1)
+    ]
+    return build_prompt_prefix(board, grade, subject), prompts
+
+def assemble_paper(shard_results, board, grade, subject, topic, paper_type, cache_key, model=None):
+    """Merge shard results into one paper and store it in the response cache and question bank
+    
+    A model other than CLAUDE_MODEL is noted as test_info.model, and such a
+    paper is not cached: cache keys name CLAUDE_MODEL, so a budget-downgraded
+    paper would otherwise keep being served after the budget resets.
+    """
+    test_info = {
+        "board": board,
+        "grade": grade,
+        "subject": subject,
+        "topic": topic,
+        "paper_type": paper_type
+    }
+    # Banked questions carry no test_info, so take it from the first generated shard
+    test_info.update(next(
+        (result['test_info'] for result in shard_results if (result or {}).get('test_info')), {}
+    ))
+    if model and model != CLAUDE_MODEL:
+        test_info['model'] = model
+    with span("merge"):
+        test_data = merge_shard_results(shard_results, test_info)
+    
+    if not test_data['questions']:
+        raise GenerationError("❌ Could not parse AI response. Try again.")
+    
+    with span("store", questions=len(test_data['questions'])):
+        if not model or model == CLAUDE_MODEL:
+            store_response(cache_key, test_data)
+        store_questions(board, grade, subject, topic, test_data['questions'])
+        store_paper(board, grade, subject, topic, paper_type, test_data)
+    record_paper(len(test_data['questions']), model or CLAUDE_MODEL)
+    return test_data
+
+def generate_paper(board, grade, subject, topic, paper_type, include_answers_on_screen, cache_key,
+                   on_question=None, use_bank=True):
+    """Build a paper from the question bank, generating only the shortfall upstream
+    
+    Missing questions are generated as concurrent shards that are told to avoid
+    the banked ones. The merged paper is stored in the cache and the bank.
+    Questions of a failed shard are generated again with the near-duplicate
+    backfill; the shard's error is raised only if the paper is still short.
+    Calls are tagged with the paper in the usage ledger, and the session or
+    daily budget may refuse the paper or downgrade it to a cheaper model.
+    """
+    with usage_context(paper_id=uuid.uuid4().hex, board=board, grade=grade, subject=subject,
+                       topic=topic, paper_type=paper_type):
+        return _generate_paper(
+            board, grade, subject, topic, paper_type, include_answers_on_screen, cache_key, on_question, use_bank
+        )
+
+def _generate_paper(board, grade, subject, topic, paper_type, include_answers_on_screen, cache_key,
+                    on_question, use_bank):
+    # Determine counts based on paper type
+    mcq_count, short_count = get_question_counts(paper_type)
+    
+    banked_mcq, banked_short = [], []
+    if use_bank:
+        with span("bank_lookup") as fields:
+            banked_mcq, banked_short = select_questions(board, grade, subject, topic, mcq_count, short_count)
+            fields['questions'] = len(banked_mcq) + len(banked_short)
+        inc("mocktest_bank_questions_total", len(banked_mcq) + len(banked_short), source="bank")
+        for question in banked_mcq + banked_short:
+            if on_question:
+                on_question(question)
+    
+    # Number generated questions by where they land: after the banked questions of their type
+    shards = plan_shards(
+        mcq_count - len(banked_mcq), short_count - len(banked_short),
+        first_mcq_number=len(banked_mcq) + 1, first_short_number=mcq_count + len(banked_short) + 1
+    )
+    if not shards:
+        return assemble_paper([{'questions': banked_mcq + banked_short}], board, grade, subject, topic, paper_type, cache_key)
+    
+    if not CLAUDE_API_KEY or CLAUDE_API_KEY == "REPLACE_WITH_YOUR_API_KEY":
+        raise GenerationError("❌ API key not configured")
+    
+    budget_decision, budget_message = check_budget()
+    if budget_decision == "refuse":
+        raise GenerationError(budget_message)
+    model = DOWNGRADE_MODEL if budget_decision == "downgrade" else CLAUDE_MODEL
+    
+    system_prompt = build_prompt_prefix(board, grade, subject)
+    banked_texts = tuple(question.get('question', '') for question in banked_mcq + banked_short)
+    
+    def make_shard_job(shard_index, shard_total, shard_mcq, shard_short, first_number, avoid_texts):
+        def build_prompt(prompt_mcq, prompt_short, prompt_first_number, avoid_questions):
+            return build_generation_prompt(
+                board, grade, subject, topic, paper_type, prompt_mcq, prompt_short,
+                include_answers_on_screen, shard_index, shard_total, prompt_first_number,
+                avoid_texts + tuple(avoid_questions)
+            )
+        return lambda callback: generate_shard(build_prompt, shard_mcq, shard_short, first_number, callback, system_prompt, model)
+    
+    failures = []
+    
+    def tolerate_failure(job):
+        # A failed shard only leaves its questions missing; the backfill asks for them again
+        def run(callback):
+            try:
+                return job(callback)
+            except GenerationError as e:
+                failures.append(e)
+                inc("mocktest_shard_failures_total")
+                return None
+        return run
+    
+    def run_generation(shards, avoid_texts):
+        """Generate shards concurrently; returns (MCQ shard results, short answer shard results)"""
+        shard_jobs = [
+            tolerate_failure(make_shard_job(index, len(shards), shard_mcq, shard_short, first_number, avoid_texts))
+            for index, (shard_mcq, shard_short, first_number) in enumerate(shards, 1)
+        ]
+        shard_results = run_shards(shard_jobs, on_question)
+        inc("mocktest_bank_questions_total", sum(len((result or {}).get('questions', [])) for result in shard_results), source="generated")
+        return (
+            [result for result, (shard_mcq, _, _) in zip(shard_results, shards) if shard_mcq],
+            [result for result, (shard_mcq, _, _) in zip(shard_results, shards) if not shard_mcq]
+        )
+    
+    mcq_results, short_results = run_generation(shards, banked_texts)
+    
+    # Replace near-duplicates (and questions a shard failed or came up short on) so the paper keeps its counts
+    for _ in range(MAX_BACKFILL_ROUNDS):
+        kept, _ = unique_questions([{'questions': banked_mcq}, *mcq_results, {'questions': banked_short}, *short_results])
+        kept_short = sum(1 for question in kept if question.get('type') == 'short_answer')
+        kept_mcq = len(kept) - kept_short
+        backfill_shards = plan_shards(
+            max(mcq_count - kept_mcq, 0), max(short_count - kept_short, 0),
+            first_mcq_number=kept_mcq + 1, first_short_number=mcq_count + kept_short + 1
+        )
+        if not backfill_shards:
+            break
+        inc("mocktest_backfill_questions_total", sum(shard_mcq + shard_short for shard_mcq, shard_short, _ in backfill_shards))
+        backfill_mcq, backfill_short = run_generation(
+            backfill_shards, tuple(question.get('question', '') for question in kept)
+        )
+        mcq_results += backfill_mcq
+        short_results += backfill_short
+    
+    # Keep MCQs ahead of short answer questions in the merged paper
+    ordered_results = [{'questions': banked_mcq}] + mcq_results + [{'questions': banked_short}] + short_results
+    
+    if failures and len(unique_questions(ordered_results)[0]) < mcq_count + short_count:
+        # Still short after backfill: fail the paper, but bank the questions already paid for
+        generated = [question for result in mcq_results + short_results for question in (result or {}).get('questions', [])]
+        with span("store", questions=len(generated)):
+            store_questions(board, grade, subject, topic, generated)
+        raise failures[-1]
+    return assemble_paper(ordered_results, board, grade, subject, topic, paper_type, cache_key, model)
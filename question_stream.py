@@ -0,0 +1,143 @@
+import json
+
+from json_extract import extract_json
+
+def iter_sse_events(lines):
+    """Parse server-sent event lines into (event, data) pairs"""
+    event_type = None
+    data_lines = []
+
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r\n")
+
+        # A blank line terminates the current event
+        if not line:
+            if data_lines:
+                yield event_type or "message", "\n".join(data_lines)
+            event_type = None
+            data_lines = []
+            continue
+
+        if line.startswith(":"):
+            continue  # SSE comment / keep-alive ping
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+
+        if field == "event":
+            event_type = value
+        elif field == "data":
+            data_lines.append(value)
+
+    if data_lines:
+        yield event_type or "message", "\n".join(data_lines)
+
+def iter_message_stream(lines):
+    """Turn a Messages API event stream into ("text", delta), ("usage", usage) and ("stop", info) items"""
+    for event_type, data in iter_sse_events(lines):
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            continue
+
+        payload_type = payload.get("type", event_type)
+
+        if payload_type == "message_start":
+            yield "usage", payload.get("message", {}).get("usage", {})
+
+        elif payload_type == "content_block_delta":
+            delta = payload.get("delta", {})
+            if delta.get("type") == "text_delta":
+                yield "text", delta.get("text", "")
+
+        elif payload_type == "message_delta":
+            yield "stop", {
+                "stop_reason": payload.get("delta", {}).get("stop_reason"),
+                "usage": payload.get("usage", {})
+            }
+
+        elif payload_type == "error":
+            error = payload.get("error", {})
+            raise RuntimeError(f"Stream error: {error.get('message', 'Unknown error')}")
+
+class IncrementalQuestionParser:
+    """Incrementally scan streamed JSON and emit each question object once it closes"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.questions = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._questions_depth = None
+        self._object_start = None
+
+    def feed(self, text):
+        """Add streamed text and return the question objects completed by it"""
+        self.buffer += text
+        buffer = self.buffer
+        completed = []
+
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+
+            elif ch == "{" or ch == "[":
+                self._depth += 1
+                if ch == "[" and self._questions_depth is None and self._last_string == "questions":
+                    self._questions_depth = self._depth
+                elif ch == "{" and self._questions_depth is not None and self._depth == self._questions_depth + 1:
+                    self._object_start = i
+                self._last_string = None
+
+            elif ch == "}" or ch == "]":
+                if ch == "}" and self._object_start is not None and self._depth == self._questions_depth + 1:
+                    question = self._load_question(buffer[self._object_start:i + 1])
+                    if question is not None:
+                        self.questions.append(question)
+                        completed.append(question)
+                    self._object_start = None
+                elif ch == "]" and self._depth == self._questions_depth:
+                    self._questions_depth = None
+                self._depth = max(self._depth - 1, 0)
+
+            elif ch == ",":
+                self._last_string = None
+
+        self._pos = len(buffer)
+        return completed
+
+    def _load_question(self, text):
+        try:
+            question = json.loads(text)
+        except ValueError:
+            try:
+                question, _ = extract_json(text)
+            except ValueError:
+                return None
+        return question if isinstance(question, dict) else None
+
+def salvage_questions(text):
+    """Recover every complete question object from possibly truncated JSON text"""
+    parser = IncrementalQuestionParser()
+    parser.feed(text)
+    return parser.questions
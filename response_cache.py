@@ -0,0 +1,154 @@
+import sqlite3
+import json
+import hashlib
+import threading
+import time
+import os
+
+# Cache Configuration
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "response_cache.db")
+)
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 60 * 60))  # 7 days
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2000))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # 200 MB
+
+_local = threading.local()
+
+def normalize_text(value):
+    """Normalize a form value so equivalent inputs share one cache entry"""
+    return " ".join(str(value).lower().split())
+
+def make_cache_key(board, grade, subject, topic, paper_type, model, prompt_version):
+    """Hash the normalized generation inputs into a content-addressed cache key"""
+    key_parts = [
+        normalize_text(board),
+        int(grade),
+        normalize_text(subject),
+        normalize_text(topic),
+        normalize_text(paper_type),
+        str(model),
+        str(prompt_version)
+    ]
+    payload = json.dumps(key_parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _get_connection():
+    """Get a per-thread SQLite connection to the shared on-disk cache"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == RESPONSE_CACHE_PATH:
+        return conn
+
+    cache_dir = os.path.dirname(RESPONSE_CACHE_PATH)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # WAL mode lets Streamlit sessions and worker processes read while one writes
+    conn = sqlite3.connect(RESPONSE_CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+
+    _local.conn = conn
+    _local.path = RESPONSE_CACHE_PATH
+    return conn
+
+def get_cached_response(key, ttl=None):
+    """Return the cached test data for a key, or None on a miss or expired entry"""
+    ttl = RESPONSE_CACHE_TTL if ttl is None else ttl
+
+    try:
+        conn = _get_connection()
+        row = conn.execute(
+            "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        payload, created_at = row
+        now = time.time()
+
+        if ttl and now - created_at > ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+
+        # Touch the entry so LRU eviction keeps frequently requested papers
+        conn.execute(
+            "UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key)
+        )
+        return json.loads(payload)
+
+    except (sqlite3.Error, ValueError):
+        # A broken cache must never block generation
+        return None
+
+def store_response(key, test_data):
+    """Store generated test data and evict expired / least recently used entries"""
+    try:
+        payload = json.dumps(test_data, ensure_ascii=False)
+        now = time.time()
+        conn = _get_connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, payload, size, created_at, last_used, hits) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            (key, payload, len(payload.encode("utf-8")), now, now)
+        )
+        evict_entries(conn)
+        return True
+
+    except (sqlite3.Error, TypeError, ValueError):
+        return False
+
+def evict_entries(conn=None):
+    """Apply TTL expiry, then the entry and byte caps in least-recently-used order"""
+    conn = conn or _get_connection()
+
+    if RESPONSE_CACHE_TTL:
+        conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (time.time() - RESPONSE_CACHE_TTL,)
+        )
+
+    conn.execute("""
+        DELETE FROM responses WHERE key IN (
+            SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+        )
+    """, (RESPONSE_CACHE_MAX_ENTRIES,))
+
+    conn.execute("""
+        DELETE FROM responses WHERE key IN (
+            SELECT key FROM (
+                SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS running_size
+                FROM responses
+            ) WHERE running_size > ?
+        )
+    """, (RESPONSE_CACHE_MAX_BYTES,))
+
+def clear_cache():
+    """Remove every cached response"""
+    try:
+        _get_connection().execute("DELETE FROM responses")
+        return True
+    except sqlite3.Error:
+        return False
+
+def get_cache_stats():
+    """Get entry count, total size and hit count for the cache"""
+    try:
+        entries, total_size, total_hits = _get_connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+        ).fetchone()
+        return {"entries": entries, "bytes": total_size, "hits": total_hits}
+    except sqlite3.Error:
+        return {"entries": 0, "bytes": 0, "hits": 0}
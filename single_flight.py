@@ -0,0 +1,130 @@
+import threading
+import time
+import os
+from contextlib import contextmanager
+
+# fcntl is POSIX only - without it coalescing stays within one process
+try:
+    import fcntl
+    FILE_LOCK_AVAILABLE = True
+except ImportError:
+    FILE_LOCK_AVAILABLE = False
+
+# Single-flight Configuration
+SINGLE_FLIGHT_CROSS_PROCESS = os.getenv("SINGLE_FLIGHT_CROSS_PROCESS", "false").lower() in ("1", "true", "yes")
+SINGLE_FLIGHT_LOCK_DIR = os.getenv(
+    "SINGLE_FLIGHT_LOCK_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "locks")
+)
+SINGLE_FLIGHT_LOCK_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", 180))
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run fn once for all concurrent callers of key
+
+        Returns (result, shared) where shared is True for callers that
+        waited on another caller's execution. Exceptions raised by fn are
+        re-raised in every waiting caller.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = _Call()
+                    self._calls[key] = call
+
+            if is_leader:
+                return self._run(key, call, fn), False
+
+            call.done.wait()
+
+            # The leader was interrupted (e.g. a Streamlit rerun stopped its
+            # script thread), so try again and possibly become the new leader
+            if call.error is not None and not isinstance(call.error, Exception):
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+    def _run(self, key, call, fn):
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self):
+        """Number of keys currently being executed"""
+        with self._lock:
+            return len(self._calls)
+
+@contextmanager
+def file_lock(key, timeout=None):
+    """Hold an exclusive cross-process lock for key, yielding whether it was acquired
+
+    Gives up after timeout seconds so a stuck process cannot block others forever.
+    """
+    if not FILE_LOCK_AVAILABLE:
+        yield False
+        return
+
+    timeout = SINGLE_FLIGHT_LOCK_TIMEOUT if timeout is None else timeout
+    os.makedirs(SINGLE_FLIGHT_LOCK_DIR, exist_ok=True)
+    lock_path = os.path.join(SINGLE_FLIGHT_LOCK_DIR, f"{key}.lock")
+
+    with open(lock_path, "a") as lock_file:
+        deadline = time.monotonic() + timeout
+        acquired = False
+
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+_generation_flight = SingleFlight()
+
+def run_single_flight(key, fn, cross_process=None):
+    """Run fn through the process-wide single-flight group
+
+    With cross_process enabled the leader also holds a file lock for key, so
+    leaders in other worker processes wait instead of calling upstream; fn
+    should re-check the shared cache once it runs.
+    """
+    cross_process = SINGLE_FLIGHT_CROSS_PROCESS if cross_process is None else cross_process
+
+    def locked_fn():
+        if not cross_process:
+            return fn()
+        with file_lock(key):
+            return fn()
+
+    return _generation_flight.do(key, locked_fn)
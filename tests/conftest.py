@@ -0,0 +1,44 @@
+"""Shared fixtures: a local Claude API stand-in and throwaway data stores
+
+The SQLite stores are pointed at a temporary directory before any app module
+is imported, so tests never touch data/ or .cache/.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix="mocktest-tests-")
+os.environ.setdefault("RESPONSE_CACHE_PATH", os.path.join(_DATA_DIR, "response_cache.db"))
+os.environ.setdefault("QUESTION_BANK_PATH", os.path.join(_DATA_DIR, "question_bank.db"))
+os.environ.setdefault("USAGE_LEDGER_PATH", os.path.join(_DATA_DIR, "usage_ledger.db"))
+os.environ.setdefault("SINGLE_FLIGHT_LOCK_DIR", os.path.join(_DATA_DIR, "locks"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_claude_server
+import question_generator
+
+@pytest.fixture
+def stand_in():
+    """Start a stand-in server; call it with ServerConfig options, get back (server, messages URL)"""
+    servers = []
+
+    def start(**options):
+        server = mock_claude_server.start_server(mock_claude_server.ServerConfig(seed=7, **options), port=0)
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1/messages"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def generator(stand_in, monkeypatch):
+    """question_generator pointed at a fresh stand-in; returns the server"""
+    server, url = stand_in()
+    monkeypatch.setattr(question_generator, "CLAUDE_API_URL", url)
+    monkeypatch.setattr(question_generator, "CLAUDE_API_KEY", "sk-ant-api03-local")
+    return server
@@ -0,0 +1,47 @@
+"""The API connection test as seen through the circuit breaker"""
+import time
+
+import question_generator
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, get_circuit_breaker
+from question_generator import generation_available
+
+def open_breaker(open_seconds):
+    breaker = get_circuit_breaker(question_generator.CLAUDE_API_URL)
+    breaker.open_seconds = open_seconds
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+def test_open_circuit_fails_the_connection_test_without_calling_upstream(generator):
+    open_breaker(60)
+
+    working, message = question_generator.test_claude_api()
+
+    assert not working
+    assert "temporarily unavailable" in message
+    assert not generation_available()
+    assert generator.config.stats.get("requests", 0) == 0
+
+def test_connection_test_is_the_half_open_probe(generator):
+    breaker = open_breaker(0.1)
+    time.sleep(0.2)
+    assert breaker.state == HALF_OPEN
+    assert generation_available()
+
+    working, message = question_generator.test_claude_api()
+
+    assert working, message
+    assert breaker.state == CLOSED
+    assert generator.config.stats["requests"] == 1
+
+def test_failed_probe_opens_the_circuit_again(generator):
+    breaker = open_breaker(0.1)
+    time.sleep(0.2)
+    generator.config.rate_5xx = 1.0
+
+    working, message = question_generator.test_claude_api()
+
+    assert not working
+    assert "temporarily unavailable" not in message
+    assert breaker.state == OPEN
@@ -0,0 +1,125 @@
+"""Hedged Messages API calls against the stand-in with injected slow responses"""
+import threading
+import time
+
+import claude_client
+from claude_client import ClaudeClient, HedgePolicy
+from metrics import REGISTRY
+
+PAYLOAD = {
+    "model": "claude-3-5-sonnet-20241022",
+    "max_tokens": 4000,
+    "messages": [{"role": "user", "content": 'Create a challenging CBSE Grade 10 Mathematics test on "Quadratic Equations".\n'
+                                              "Generate 5 difficult multiple choice questions about Quadratic Equations."}]
+}
+
+def counter_value(name, **labels):
+    key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+    return REGISTRY.counter(name)._values.get(key, 0)
+
+def delays(*seconds):
+    """Stand-in latency giving each request the next delay in turn, then none"""
+    remaining = list(seconds)
+    lock = threading.Lock()
+
+    def latency(rng):
+        with lock:
+            return remaining.pop(0) if remaining else 0
+    return latency
+
+def hedge_usage(monkeypatch):
+    """Usage recorded for losing hedges, as (usage, kind) pairs"""
+    recorded = []
+    monkeypatch.setattr(claude_client, "record_call", lambda usage, model, *args, kind=None, **kwargs: recorded.append((usage, kind)))
+    return recorded
+
+def wait_for(condition, seconds=15):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline and not condition():
+        time.sleep(0.1)
+
+def hedging_client(url, max_rate=1.0):
+    client = ClaudeClient("sk-ant-api03-local", url, hedge=True)
+    client.hedge_policy = HedgePolicy(percentile=95, max_rate=max_rate, min_delay=0.2, min_samples=1)
+    client.hedge_policy.observe("complete", 0.05)
+    client.hedge_policy.observe("stream", 0.05)
+    return client
+
+def test_policy_waits_for_samples_and_caps_the_hedge_rate():
+    policy = HedgePolicy(percentile=50, max_rate=0.25, min_delay=0.1, min_samples=4, window=8)
+    for seconds in (0.4, 0.2, 0.3):
+        policy.observe("complete", seconds)
+    assert policy.delay("complete") is None
+
+    policy.observe("complete", 0.05)
+    assert policy.delay("complete") == 0.3
+
+    assert [policy.record(True) for _ in range(8)] == [False, False, False, True, False, False, False, True]
+
+def test_slow_call_is_hedged_and_the_duplicate_wins(stand_in, monkeypatch):
+    recorded = hedge_usage(monkeypatch)
+    server, url = stand_in(latency="0")
+    server.config.latency = delays(3)
+    client = hedging_client(url)
+    fired = counter_value("mocktest_hedges_fired_total", kind="complete")
+    won = counter_value("mocktest_hedges_won_total", kind="complete")
+
+    started = time.perf_counter()
+    response = client.post_messages(PAYLOAD)
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert elapsed < 1.5
+    assert server.config.stats["requests"] == 2
+    assert counter_value("mocktest_hedges_fired_total", kind="complete") == fired + 1
+    assert counter_value("mocktest_hedges_won_total", kind="complete") == won + 1
+
+    # The stalled original still runs to completion and is billed in full
+    wait_for(lambda: recorded)
+    [(usage, kind)] = recorded
+    assert kind == "hedge"
+    assert usage["input_tokens"] > 0 and usage["output_tokens"] > 1
+
+def test_original_call_wins_when_it_finishes_first(stand_in):
+    server, url = stand_in(latency="0")
+    server.config.latency = delays(0.5, 3)
+    client = hedging_client(url)
+    fired = counter_value("mocktest_hedges_fired_total", kind="complete")
+    won = counter_value("mocktest_hedges_won_total", kind="complete")
+
+    started = time.perf_counter()
+    response = client.post_messages(PAYLOAD)
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert elapsed < 1.5
+    assert counter_value("mocktest_hedges_fired_total", kind="complete") == fired + 1
+    assert counter_value("mocktest_hedges_won_total", kind="complete") == won
+
+def test_losing_stream_is_cancelled(stand_in, monkeypatch):
+    recorded = hedge_usage(monkeypatch)
+    server, url = stand_in(latency="0", tokens_per_second=400)
+    server.config.latency = delays(1)
+    client = hedging_client(url)
+
+    response = client.post_messages(dict(PAYLOAD, stream=True), stream=True)
+    assert response.status_code == 200
+    assert b"event: message_stop" in list(response.iter_lines())
+
+    # The stalled original lands after the hedge won; its stream is dropped mid-way
+    wait_for(lambda: server.config.stats.get("cancelled"))
+    assert server.config.stats["streams"] == 2
+    assert server.config.stats.get("cancelled") == 1
+    [(usage, kind)] = recorded
+    assert kind == "hedge"
+    assert usage["input_tokens"] > 0
+
+def test_calls_over_the_hedge_rate_are_not_hedged(stand_in):
+    server, url = stand_in(latency="0")
+    server.config.latency = delays(0.6)
+    client = hedging_client(url, max_rate=0)
+
+    response = client.post_messages(PAYLOAD)
+
+    assert response.status_code == 200
+    assert server.config.stats["requests"] == 1
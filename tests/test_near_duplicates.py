@@ -0,0 +1,34 @@
+"""Near-duplicate detection within papers and across the question bank"""
+from near_duplicates import drop_near_duplicates
+from question_bank import store_questions
+
+def mcq(question, options, answer):
+    return {"type": "mcq", "question": question, "options": dict(zip("ABCD", options)), "correct_answer": answer}
+
+DISTINCT = [
+    mcq("Which of the following is a prime number?", ["4", "9", "13", "21"], "C"),
+    mcq("Which of the following is a prime number?", ["6", "15", "17", "25"], "C"),
+    mcq("Which of the following is NOT a factor of 36?", ["4", "6", "9", "10"], "D"),
+    mcq("Which of the following is a factor of 36?", ["5", "7", "10", "12"], "D"),
+    mcq("What is the chemical formula of water?", ["H2O", "H2O2", "HO", "OH"], "A"),
+    mcq("What is the chemical formula of ammonia?", ["NH3", "NH4", "N2H4", "HN3"], "A"),
+    mcq("When does a quadratic equation have equal roots?", ["D > 0", "D = 0", "D < 0", "Never"], "B"),
+    mcq("When does a quadratic equation have real and distinct roots?", ["D > 0", "D = 0", "D < 0", "Never"], "A")
+]
+
+def test_distinct_questions_are_kept():
+    unique, duplicates = drop_near_duplicates(DISTINCT)
+    assert duplicates == []
+    assert unique == DISTINCT
+
+def test_rephrased_and_shuffled_repeats_are_dropped():
+    original = mcq("What is the discriminant of x² + 5x + 6 = 0?", ["1", "-1", "49", "24"], "A")
+    rephrased = mcq("Find the discriminant of x² + 5x + 6 = 0.", ["1", "-1", "49", "24"], "A")
+    shuffled = mcq("What is the discriminant of x² + 5x + 6 = 0?", ["24", "49", "1", "-1"], "C")
+    unique, duplicates = drop_near_duplicates([original, rephrased, shuffled])
+    assert unique == [original]
+    assert duplicates == [rephrased, shuffled]
+
+def test_bank_accepts_distinct_questions_of_a_subject():
+    assert store_questions("CBSE", 7, "Dedup Test", "Numbers", DISTINCT) == len(DISTINCT)
+    assert store_questions("CBSE", 7, "Dedup Test", "Numbers", [DISTINCT[0]]) == 0
@@ -0,0 +1,96 @@
+"""Planning and assembling papers from banked and generated questions"""
+import threading
+
+import pytest
+
+import mock_claude_server
+import question_generator
+from question_bank import select_questions
+from question_generator import GenerationError, plan_shards, generate_paper
+from response_cache import get_cached_response
+
+def fail_completions(monkeypatch, should_fail):
+    """Make the stand-in answer unparseable text to the calls should_fail(call number) picks"""
+    build_completion = mock_claude_server.build_completion
+    calls = []
+    lock = threading.Lock()
+
+    def failing(payload, config, rng):
+        with lock:
+            calls.append(payload)
+            number = len(calls)
+        if should_fail(number):
+            return "Sorry, I cannot help with that.", "end_turn"
+        return build_completion(payload, config, rng)
+
+    monkeypatch.setattr(mock_claude_server, "build_completion", failing)
+    return calls
+
+def test_plan_shards_numbers_a_whole_paper():
+    assert plan_shards(15, 8, shard_size=5) == [(5, 0, 1), (5, 0, 6), (5, 0, 11), (0, 5, 16), (0, 3, 21)]
+
+def test_plan_shards_numbers_generated_questions_after_banked_ones():
+    # Paper 2 with 4 MCQs and 3 short answers banked: MCQs 1-4 and short answers 16-18 come from the bank
+    shards = plan_shards(11, 5, shard_size=5, first_mcq_number=5, first_short_number=19)
+    assert shards == [(5, 0, 5), (5, 0, 10), (1, 0, 15), (0, 5, 19)]
+
+def test_dropped_duplicates_are_generated_again(generator, monkeypatch):
+    monkeypatch.setattr(question_generator, "SHARD_SIZE", 5)
+    make_questions = mock_claude_server.make_questions
+    requests = []
+
+    def repeat_first_shard(subject, topic, mcq_count, short_count, first_number, rng):
+        questions = make_questions(subject, topic, mcq_count, short_count, first_number, rng)
+        requests.append(len(questions))
+        if len(requests) == 1:
+            # Every question of the first completion repeats its first question
+            questions = [dict(questions[0], question_number=first_number + i) for i in range(len(questions))]
+        return questions
+
+    monkeypatch.setattr(mock_claude_server, "make_questions", repeat_first_shard)
+
+    test_data = generate_paper("CBSE", 10, "Mathematics", "Arithmetic Progressions", "Paper 1 (25 MCQs)", False,
+                               "backfill-test", use_bank=False)
+
+    assert test_data["test_info"]["duplicates_removed"] == 4
+    assert len(test_data["questions"]) == 25
+    assert requests[5:] == [4]
+
+def test_failed_shard_is_generated_again(generator, monkeypatch):
+    monkeypatch.setattr(question_generator, "SHARD_SIZE", 5)
+    calls = fail_completions(monkeypatch, lambda number: number == 2)
+
+    test_data = generate_paper("CBSE", 10, "Mathematics", "Triangles", "Paper 1 (25 MCQs)", False,
+                               "failed-shard-test", use_bank=False)
+
+    assert len(test_data["questions"]) == 25
+    assert [question["question_number"] for question in test_data["questions"]] == list(range(1, 26))
+    assert len(calls) == 6
+    assert get_cached_response("failed-shard-test") is not None
+
+def test_paper_still_short_after_backfill_fails_but_banks_finished_shards(generator, monkeypatch):
+    monkeypatch.setattr(question_generator, "SHARD_SIZE", 5)
+    # The first shard keeps failing, every backfill included
+    calls = fail_completions(monkeypatch, lambda number: number == 1 or number > 5)
+
+    with pytest.raises(GenerationError):
+        generate_paper("CBSE", 10, "Chemistry", "Acids and Bases", "Paper 1 (25 MCQs)", False,
+                       "short-paper-test", use_bank=False)
+
+    assert len(calls) == 5 + question_generator.MAX_BACKFILL_ROUNDS
+    assert get_cached_response("short-paper-test") is None
+    banked, _ = select_questions("CBSE", 10, "Chemistry", "Acids and Bases", 25, 0)
+    assert len(banked) == 20
+
+def test_downgraded_papers_are_not_cached(generator, monkeypatch):
+    monkeypatch.setattr(question_generator, "check_budget", lambda: ("downgrade", "Budget nearly used up"))
+
+    test_data = generate_paper("CBSE", 10, "Physics", "Motion", "Paper 1 (25 MCQs)", False, "downgrade-test", use_bank=False)
+
+    assert test_data["test_info"]["model"] == question_generator.DOWNGRADE_MODEL
+    assert get_cached_response("downgrade-test") is None
+
+def test_primary_model_papers_are_cached(generator):
+    generate_paper("CBSE", 10, "Physics", "Motion", "Paper 1 (25 MCQs)", False, "primary-test", use_bank=False)
+
+    assert len(get_cached_response("primary-test")["questions"]) == 25
@@ -0,0 +1,53 @@
+"""Shape of generation requests: a stable system prefix and a per-topic suffix"""
+import mock_claude_server
+import question_generator
+from question_generator import build_prompt_prefix, generate_paper, request_completion
+
+def capture(monkeypatch, name, function):
+    """Record the arguments of every call to a module function, still calling it"""
+    calls = []
+
+    def recorder(*args, **kwargs):
+        calls.append(args)
+        return function(*args, **kwargs)
+
+    monkeypatch.setattr(*name, recorder)
+    return calls
+
+def test_prefix_is_shared_by_every_shard_and_topic(generator, monkeypatch):
+    completions = capture(monkeypatch, (mock_claude_server, "build_completion"), mock_claude_server.build_completion)
+
+    for topic in ("Nature of Roots", "Sum of AP Terms"):
+        generate_paper("CBSE", 10, "Mathematics", topic, "Paper 2 (23 Mixed)", False, f"shape-{topic}", use_bank=False)
+
+    payloads = [payload for payload, _, _ in completions]
+    prefix = build_prompt_prefix("CBSE", 10, "Mathematics")
+    assert len(payloads) == 10
+    for payload in payloads:
+        assert [block["text"] for block in payload["system"]] == [prefix]
+        assert prefix not in payload["messages"][0]["content"]
+    assert "Nature of Roots" not in prefix
+    assert sum("Nature of Roots" in payload["messages"][0]["content"] for payload in payloads) == 5
+
+def test_short_prefix_is_sent_unmarked(generator, monkeypatch):
+    completions = capture(monkeypatch, (mock_claude_server, "build_completion"), mock_claude_server.build_completion)
+    usages = capture(monkeypatch, (question_generator, "record_call"), lambda *args, **kwargs: None)
+    prefix = build_prompt_prefix("CBSE", 10, "Mathematics")
+
+    request_completion("Test", system_prompt=prefix)
+    request_completion("Test", system_prompt=prefix)
+
+    assert all("cache_control" not in payload["system"][0] for payload, _, _ in completions)
+    assert all(usage["cache_read_input_tokens"] == usage["cache_creation_input_tokens"] == 0 for usage, *_ in usages)
+
+def test_long_prefix_is_marked_and_read_from_cache(generator, monkeypatch):
+    completions = capture(monkeypatch, (mock_claude_server, "build_completion"), mock_claude_server.build_completion)
+    usages = capture(monkeypatch, (question_generator, "record_call"), lambda *args, **kwargs: None)
+    prefix = "Long board guidelines. " * 400
+
+    request_completion("Test", system_prompt=prefix)
+    request_completion("Test", system_prompt=prefix)
+
+    assert all(payload["system"][0]["cache_control"] == {"type": "ephemeral"} for payload, _, _ in completions)
+    assert usages[0][0]["cache_creation_input_tokens"] > 0
+    assert usages[1][0]["cache_read_input_tokens"] == usages[0][0]["cache_creation_input_tokens"]
@@ -0,0 +1,58 @@
+"""Streamed generation against the local stand-in's server-sent events"""
+import json
+
+import mock_claude_server
+import question_generator
+from question_generator import request_completion, parse_test_response, generate_paper
+
+QUESTIONS = [
+    {
+        "question_number": 1,
+        "type": "mcq",
+        "question": "If aₙ = 3n + 2, what is a₅?",
+        "options": {"A": "15", "B": "17", "C": "13", "D": "20"},
+        "correct_answer": "B",
+        "explanation": "Substitute n = 5: a₅ = 3 × 5 + 2 = 17."
+    },
+    {
+        "question_number": 2,
+        "type": "mcq",
+        "question": "For x² + bx + 9 = 0 to have equal roots, what is b²?",
+        "options": {"A": "9", "B": "18", "C": "36", "D": "81"},
+        "correct_answer": "C",
+        "explanation": "Equal roots need b² − 4ac = 0, so b² = 36 — “the discriminant vanishes”."
+    }
+]
+
+# A completion with a smart-quoted key, as real completions sometimes have
+COMPLETION = json.dumps(
+    {"test_info": {"subject": "Mathematics", "topic": "Sequences"}, "questions": QUESTIONS},
+    indent=4, ensure_ascii=False
+).replace('"correct_answer": "C"', '“correct_answer”: "C"')
+
+def test_stream_keeps_non_ascii_text(generator, monkeypatch):
+    monkeypatch.setattr(mock_claude_server, "build_completion", lambda payload, config, rng: (COMPLETION, "end_turn"))
+    streamed = []
+
+    content, stop_reason = request_completion("Sequences paper", streamed.append, "System prompt")
+
+    assert stop_reason == "end_turn"
+    assert content == COMPLETION
+    assert streamed[0] == QUESTIONS[0]
+    assert parse_test_response(content)["questions"] == QUESTIONS
+    assert generator.config.stats["streams"] == 1
+
+def test_streamed_paper_matches_questions_shown(generator, monkeypatch):
+    monkeypatch.setattr(question_generator, "SHARD_SIZE", 4)
+    streamed = []
+
+    test_data = generate_paper(
+        "CBSE", 10, "Mathematics", "Quadratic Equations", "Paper 2 (23 Mixed)", False, "stream-test",
+        on_question=streamed.append, use_bank=False
+    )
+
+    text = json.dumps(test_data, ensure_ascii=False)
+    assert "²" in text
+    assert "Â" not in text and "â" not in text
+    assert len(streamed) == 23
+    assert {question["question"] for question in streamed} >= {question["question"] for question in test_data["questions"]}
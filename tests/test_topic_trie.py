@@ -0,0 +1,37 @@
+"""Typeahead trie shared by every session in the process"""
+import sys
+import threading
+
+from keyword_index import PrefixTrie
+
+def test_concurrent_adds_keep_the_trie_consistent():
+    trie = PrefixTrie([("Quadratic Equations", 5), ("Arithmetic Progressions", 5)], limit=3)
+    topics = [f"Topic {i} Equations" for i in range(40)]
+    start = threading.Barrier(len(topics))
+    errors = []
+
+    def add(topic):
+        start.wait()
+        try:
+            for _ in range(50):
+                trie.add(topic)
+                trie.complete("equa")
+        except Exception as e:
+            errors.append(e)
+
+    # Switch threads often so the adds interleave mid-update
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=add, args=(topic,)) for topic in topics]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    completions = trie.complete("equa")
+    assert [popularity for _, popularity in completions] == [50, 50, 50]
+    assert trie.complete("") == completions
@@ -0,0 +1,72 @@
+from functools import lru_cache
+
+from catalog import get_catalog, catalog_revision
+from keyword_index import KeywordAutomaton, TrigramIndex, normalize_keyword_text
+
+def get_enhanced_subject_keywords():
+    """Enhanced keywords for topic validation with curriculum focus (read-only, from the subject_keywords catalog)"""
+    return get_catalog("subject_keywords").data
+
+SCIENCE_SUBJECTS = ["Physics", "Chemistry", "Biology"]
+
+# Accepted for Mathematics even though they are not Mathematics keywords
+MATH_CONCEPTS = ["hypothesis", "data", "analysis", "statistics", "probability", "graph", "chart"]
+
+def get_keyword_automata():
+    """Keyword automata compiled once per process, and again when the keyword catalog changes
+
+    Returns (keywords_dict, automaton per subject, merged Science automaton,
+    Mathematics concepts automaton).
+    """
+    return _compile_keyword_automata(catalog_revision())
+
+@lru_cache(maxsize=1)
+def _compile_keyword_automata(revision):
+    keywords_dict = get_enhanced_subject_keywords()
+    subject_automata = {subject: KeywordAutomaton(keywords) for subject, keywords in keywords_dict.items()}
+    science_automaton = KeywordAutomaton(
+        [keyword for subject in SCIENCE_SUBJECTS for keyword in keywords_dict.get(subject, [])]
+    )
+    return keywords_dict, subject_automata, science_automaton, KeywordAutomaton(MATH_CONCEPTS)
+
+def check_topic_relevance(topic, subject):
+    """Enhanced topic relevance checking with better curriculum matching"""
+    if not topic or not subject:
+        return True, []
+    
+    keywords_dict, subject_automata, science_automaton, math_automaton = get_keyword_automata()
+    
+    # Safe string operations
+    topic_clean = normalize_keyword_text(topic).strip()
+    
+    # Keyword in topic or topic in keyword (both ways)
+    automaton = subject_automata.get(subject)
+    matches = automaton is not None and automaton.matches(topic_clean)
+    
+    # Additional check for Science subject (covers Physics, Chemistry, Biology)
+    if not matches and subject == "Science":
+        matches = science_automaton.matches(topic_clean)
+    
+    # Special cases for mathematical concepts
+    if not matches and subject == "Mathematics":
+        matches = math_automaton.contains_any(topic_clean)
+    
+    return matches, list(keywords_dict.get(subject, []))
+
+def get_topic_index(subject, curriculum_topics=()):
+    """Fuzzy index over the given curriculum topics and the keywords of a subject"""
+    return _build_topic_index(subject, tuple(curriculum_topics), catalog_revision())
+
+@lru_cache(maxsize=256)
+def _build_topic_index(subject, curriculum_topics, revision):
+    keywords_dict = get_enhanced_subject_keywords()
+    terms = [*curriculum_topics, *keywords_dict.get(subject, ())]
+    if subject == "Science":
+        terms += [keyword for science_subject in SCIENCE_SUBJECTS for keyword in keywords_dict.get(science_subject, [])]
+    return TrigramIndex(terms)
+
+def suggest_topics(topic, subject, curriculum_topics=(), limit=8):
+    """Closest curriculum topics and keywords to a (possibly misspelled) topic, as (term, score) best first"""
+    if not topic or not subject:
+        return []
+    return get_topic_index(subject, curriculum_topics).search(topic, limit=limit)
@@ -0,0 +1,347 @@
+"""Append-only ledger of Messages API token usage, latency and cost
+
+Every completion is recorded with the tags of the context it ran in
+(tenant, session, board, grade, subject, topic, paper_type and paper id),
+and every assembled paper with its question count, so spend can be broken
+down per paper, per day and per question.
+
+Usage:
+    python usage_ledger.py --days 7
+    python usage_ledger.py --days 30 --group-by subject
+"""
+import argparse
+import contextvars
+import sqlite3
+import threading
+import time
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Ledger Configuration
+USAGE_LEDGER_PATH = os.getenv(
+    "USAGE_LEDGER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "usage_ledger.db")
+)
+TENANT_ID = os.getenv("TENANT_ID", "default")
+
+# Budgets; 0 disables a budget. Tokens count input, output and prompt-cache tokens.
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", 0))
+DAILY_TOKEN_BUDGET = int(os.getenv("DAILY_TOKEN_BUDGET", 0))
+DAILY_COST_BUDGET = float(os.getenv("DAILY_COST_BUDGET", 0))  # USD per tenant per UTC day
+# Share of a budget after which papers are generated with DOWNGRADE_MODEL
+BUDGET_DOWNGRADE_AT = float(os.getenv("BUDGET_DOWNGRADE_AT", 0.8))
+DOWNGRADE_MODEL = os.getenv("DOWNGRADE_MODEL", "claude-3-5-haiku-20241022")
+
+# USD per million tokens: input, output, cache write, cache read
+MODEL_PRICES = {
+    "claude-3-5-sonnet-20241022": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 1.00, 0.08)
+}
+# Message Batches requests are billed at half price
+BATCH_DISCOUNT = 0.5
+
+# Columns reports may group by
+GROUP_COLUMNS = ("paper_type", "subject", "board", "grade", "topic", "model", "tenant", "session")
+
+_local = threading.local()
+
+_usage_tags = contextvars.ContextVar("usage_tags", default={})
+
+@contextmanager
+def usage_context(**tags):
+    """Tag every call recorded in this context (and tasks copied from it)"""
+    token = _usage_tags.set(dict(_usage_tags.get(), **tags))
+    try:
+        yield
+    finally:
+        _usage_tags.reset(token)
+
+def current_tags():
+    return dict(_usage_tags.get())
+
+def utc_day(timestamp=None):
+    return datetime.fromtimestamp(timestamp or time.time(), timezone.utc).strftime("%Y-%m-%d")
+
+def estimate_cost(usage, model, batch=False):
+    """USD cost of one call's usage block; unknown models are priced as zero"""
+    input_price, output_price, cache_write_price, cache_read_price = MODEL_PRICES.get(model, (0, 0, 0, 0))
+    cost = (
+        (usage.get("input_tokens") or 0) * input_price
+        + (usage.get("output_tokens") or 0) * output_price
+        + (usage.get("cache_creation_input_tokens") or 0) * cache_write_price
+        + (usage.get("cache_read_input_tokens") or 0) * cache_read_price
+    ) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+def _get_connection():
+    """Get a per-thread SQLite connection to the on-disk ledger"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == USAGE_LEDGER_PATH:
+        return conn
+
+    ledger_dir = os.path.dirname(USAGE_LEDGER_PATH)
+    if ledger_dir:
+        os.makedirs(ledger_dir, exist_ok=True)
+
+    conn = sqlite3.connect(USAGE_LEDGER_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            id INTEGER PRIMARY KEY,
+            created_at REAL NOT NULL,
+            day TEXT NOT NULL,
+            tenant TEXT NOT NULL,
+            session TEXT,
+            paper_id TEXT,
+            board TEXT,
+            grade TEXT,
+            subject TEXT,
+            topic TEXT,
+            paper_type TEXT,
+            model TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            status INTEGER,
+            batch INTEGER NOT NULL DEFAULT 0,
+            input_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+            latency REAL,
+            cost REAL NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS papers (
+            id INTEGER PRIMARY KEY,
+            created_at REAL NOT NULL,
+            day TEXT NOT NULL,
+            tenant TEXT NOT NULL,
+            session TEXT,
+            paper_id TEXT NOT NULL,
+            board TEXT,
+            grade TEXT,
+            subject TEXT,
+            topic TEXT,
+            paper_type TEXT,
+            model TEXT,
+            questions INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_day ON calls(tenant, day)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_session ON calls(session)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_paper ON calls(paper_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_paper ON papers(paper_id)")
+
+    _local.conn = conn
+    _local.path = USAGE_LEDGER_PATH
+    return conn
+
+def _tag_values(tags):
+    return (
+        tags.get("tenant", TENANT_ID), tags.get("session"), tags.get("paper_id"),
+        tags.get("board"), None if tags.get("grade") is None else str(tags.get("grade")),
+        tags.get("subject"), tags.get("topic"), tags.get("paper_type")
+    )
+
+def record_call(usage, model, latency=None, status=200, kind="generation", batch=False):
+    """Append one API call with the current context's tags; returns its estimated cost"""
+    usage = usage or {}
+    cost = estimate_cost(usage, model, batch)
+    try:
+        now = time.time()
+        _get_connection().execute(
+            "INSERT INTO calls (created_at, day, tenant, session, paper_id, board, grade, subject, topic, "
+            "paper_type, model, kind, status, batch, input_tokens, output_tokens, cache_creation_tokens, "
+            "cache_read_tokens, latency, cost) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (now, utc_day(now)) + _tag_values(current_tags()) + (
+                model, kind, status, int(batch),
+                usage.get("input_tokens") or 0, usage.get("output_tokens") or 0,
+                usage.get("cache_creation_input_tokens") or 0, usage.get("cache_read_input_tokens") or 0,
+                latency, cost
+            )
+        )
+    except sqlite3.Error:
+        # Accounting must never block generation
+        pass
+    return cost
+
+def record_paper(questions, model=None):
+    """Append an assembled paper and its question count under the current paper id"""
+    tags = current_tags()
+    if not tags.get("paper_id"):
+        return
+    try:
+        now = time.time()
+        _get_connection().execute(
+            "INSERT INTO papers (created_at, day, tenant, session, paper_id, board, grade, subject, topic, "
+            "paper_type, model, questions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (now, utc_day(now)) + _tag_values(tags) + (model, questions)
+        )
+    except sqlite3.Error:
+        pass
+
+def get_topic_counts(board, grade, subject, tenant=None):
+    """(topic, papers generated) for a board, grade and subject, most generated first"""
+    try:
+        return _get_connection().execute(
+            "SELECT topic, COUNT(*) FROM papers WHERE tenant = ? AND board = ? AND grade = ? AND subject = ? "
+            "AND topic IS NOT NULL GROUP BY lower(topic) ORDER BY COUNT(*) DESC",
+            (tenant or TENANT_ID, board, str(grade), subject)
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+
+def get_session_usage(session):
+    """Tokens and cost recorded for one session"""
+    return _usage_totals("session = ?", (session,))
+
+def get_daily_usage(tenant=None, day=None):
+    """Tokens and cost recorded for a tenant on a UTC day (today by default)"""
+    return _usage_totals("tenant = ? AND day = ?", (tenant or TENANT_ID, day or utc_day()))
+
+def _usage_totals(where, params):
+    try:
+        calls, input_tokens, output_tokens, cache_tokens, cost = _get_connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(input_tokens), 0), COALESCE(SUM(output_tokens), 0), "
+            "COALESCE(SUM(cache_creation_tokens + cache_read_tokens), 0), COALESCE(SUM(cost), 0) "
+            f"FROM calls WHERE {where}", params
+        ).fetchone()
+    except sqlite3.Error:
+        calls = input_tokens = output_tokens = cache_tokens = cost = 0
+    return {
+        "calls": calls,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cache_tokens": cache_tokens,
+        "total_tokens": input_tokens + output_tokens + cache_tokens,
+        "cost": cost
+    }
+
+def check_budget(session=None, tenant=None):
+    """Decide whether a new paper may call the API: ("ok" | "downgrade" | "refuse", message)
+
+    A budget that is used up refuses generation; one used past
+    BUDGET_DOWNGRADE_AT downgrades it to DOWNGRADE_MODEL.
+    """
+    tags = current_tags()
+    session = session or tags.get("session")
+    tenant = tenant or tags.get("tenant", TENANT_ID)
+
+    checks = []
+    if SESSION_TOKEN_BUDGET and session:
+        checks.append(("session token", get_session_usage(session)["total_tokens"], SESSION_TOKEN_BUDGET))
+    if DAILY_TOKEN_BUDGET or DAILY_COST_BUDGET:
+        daily = get_daily_usage(tenant)
+        if DAILY_TOKEN_BUDGET:
+            checks.append(("daily token", daily["total_tokens"], DAILY_TOKEN_BUDGET))
+        if DAILY_COST_BUDGET:
+            checks.append(("daily cost", daily["cost"], DAILY_COST_BUDGET))
+
+    decision, message = "ok", None
+    for name, used, budget in checks:
+        if used >= budget:
+            return "refuse", f"❌ The {name} budget is used up ({used:,.2f} of {budget:,.2f}). Try again later."
+        if used >= budget * BUDGET_DOWNGRADE_AT:
+            decision, message = "downgrade", f"⚠️ Over {BUDGET_DOWNGRADE_AT:.0%} of the {name} budget used - generating with {DOWNGRADE_MODEL}"
+    return decision, message
+
+def _since(days):
+    return utc_day(time.time() - (days - 1) * 86400) if days else "0000-00-00"
+
+def _check_group(group_by):
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_COLUMNS)}")
+    return group_by
+
+def tokens_per_paper(days=None, group_by="paper_type", tenant=None):
+    """Average tokens and cost per generated paper, grouped by a tag column"""
+    group_by = _check_group(group_by)
+    rows = _get_connection().execute(f"""
+        SELECT grp, COUNT(*), AVG(input_tokens), AVG(output_tokens), AVG(cache_tokens), AVG(cost), AVG(calls)
+        FROM (
+            SELECT {group_by} AS grp, paper_id, SUM(input_tokens) AS input_tokens,
+                   SUM(output_tokens) AS output_tokens,
+                   SUM(cache_creation_tokens + cache_read_tokens) AS cache_tokens,
+                   SUM(cost) AS cost, COUNT(*) AS calls
+            FROM calls
+            WHERE paper_id IS NOT NULL AND day >= ? AND tenant = ?
+            GROUP BY paper_id
+        )
+        GROUP BY grp ORDER BY AVG(cost) DESC
+    """, (_since(days), tenant or TENANT_ID)).fetchall()
+    return [
+        {"group": grp, "papers": papers, "input_tokens": input_avg, "output_tokens": output_avg,
+         "cache_tokens": cache_avg, "cost": cost_avg, "calls": calls_avg}
+        for grp, papers, input_avg, output_avg, cache_avg, cost_avg, calls_avg in rows
+    ]
+
+def cost_per_day(days=30, tenant=None):
+    """Calls, tokens and cost per UTC day, newest first"""
+    rows = _get_connection().execute("""
+        SELECT day, COUNT(*), SUM(input_tokens), SUM(output_tokens),
+               SUM(cache_creation_tokens + cache_read_tokens), SUM(cost), AVG(latency)
+        FROM calls WHERE day >= ? AND tenant = ?
+        GROUP BY day ORDER BY day DESC
+    """, (_since(days), tenant or TENANT_ID)).fetchall()
+    return [
+        {"day": day, "calls": calls, "input_tokens": input_tokens, "output_tokens": output_tokens,
+         "cache_tokens": cache_tokens, "cost": cost, "latency": latency}
+        for day, calls, input_tokens, output_tokens, cache_tokens, cost, latency in rows
+    ]
+
+def tokens_per_question(days=None, group_by="paper_type", tenant=None):
+    """Output tokens, all tokens and cost per delivered question, grouped by a tag column"""
+    group_by = _check_group(group_by)
+    rows = _get_connection().execute(f"""
+        SELECT p.{group_by}, SUM(p.questions), SUM(c.output_tokens), SUM(c.total_tokens), SUM(c.cost)
+        FROM papers p
+        JOIN (
+            SELECT paper_id, SUM(output_tokens) AS output_tokens,
+                   SUM(input_tokens + output_tokens + cache_creation_tokens + cache_read_tokens) AS total_tokens,
+                   SUM(cost) AS cost
+            FROM calls WHERE paper_id IS NOT NULL GROUP BY paper_id
+        ) c ON c.paper_id = p.paper_id
+        WHERE p.day >= ? AND p.tenant = ? AND p.questions > 0
+        GROUP BY p.{group_by} ORDER BY SUM(c.output_tokens) * 1.0 / SUM(p.questions) DESC
+    """, (_since(days), tenant or TENANT_ID)).fetchall()
+    return [
+        {"group": grp, "questions": questions, "output_tokens": output_tokens / questions,
+         "total_tokens": total_tokens / questions, "cost": cost / questions}
+        for grp, questions, output_tokens, total_tokens, cost in rows
+    ]
+
+def print_report(days, group_by, tenant=None):
+    print(f"💰 Usage for tenant {tenant or TENANT_ID}, last {days} day(s)\n")
+
+    print(f"{'day':<12} {'calls':>7} {'input':>11} {'output':>11} {'cache':>11} {'cost':>10} {'latency':>9}")
+    for row in cost_per_day(days, tenant):
+        print(
+            f"{row['day']:<12} {row['calls']:>7} {row['input_tokens']:>11,} {row['output_tokens']:>11,} "
+            f"{row['cache_tokens']:>11,} ${row['cost']:>9.4f} {row['latency'] or 0:>8.2f}s"
+        )
+
+    print(f"\nPer paper by {group_by}:")
+    print(f"{group_by:<28} {'papers':>7} {'calls':>6} {'input':>9} {'output':>9} {'cache':>9} {'cost':>10}")
+    for row in tokens_per_paper(days, group_by, tenant):
+        print(
+            f"{str(row['group'])[:28]:<28} {row['papers']:>7} {row['calls']:>6.1f} {row['input_tokens']:>9,.0f} "
+            f"{row['output_tokens']:>9,.0f} {row['cache_tokens']:>9,.0f} ${row['cost']:>9.4f}"
+        )
+
+    print(f"\nPer question by {group_by}:")
+    print(f"{group_by:<28} {'questions':>9} {'output':>9} {'all':>9} {'cost':>10}")
+    for row in tokens_per_question(days, group_by, tenant):
+        print(
+            f"{str(row['group'])[:28]:<28} {row['questions']:>9} {row['output_tokens']:>9,.0f} "
+            f"{row['total_tokens']:>9,.0f} ${row['cost']:>9.5f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report token usage and cost from the usage ledger")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--group-by", default="paper_type", choices=GROUP_COLUMNS)
+    parser.add_argument("--tenant", help=f"Tenant to report on (default: TENANT_ID, {TENANT_ID})")
+    args = parser.parse_args()
+    print_report(args.days, args.group_by, args.tenant)